@@ -8,6 +8,9 @@ from .chromium_page import ChromiumPage
 from .session_page import SessionPage
 from .web_page import WebPage
 
+# 多浏览器进程池
+from .browser_pool import BrowserPool
+
 # 启动配置类
 from .configs.chromium_options import ChromiumOptions
 from .configs.session_options import SessionOptions
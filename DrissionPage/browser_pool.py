@@ -0,0 +1,219 @@
+# -*- coding:utf-8 -*-
+"""
+@Author  :   g1879
+@Contact :   g1879@qq.com
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
+from os import cpu_count
+from pathlib import Path
+from queue import Queue, Empty
+from shutil import rmtree
+from tempfile import gettempdir, mkdtemp
+from threading import Lock
+
+from requests import get as requests_get
+
+from .chromium_page import ChromiumPage
+from .commons.browser import launch_browser
+from .configs.chromium_options import ChromiumOptions
+
+
+class BrowserPool(object):
+    """并行启动多个浏览器进程，并分配其ChromiumPage对象的池"""
+
+    def __init__(self, size=None, options=None, timeout=30):
+        """
+        :param size: 浏览器数量，为None时使用cpu核心数
+        :param options: ChromiumOptions对象，每个浏览器使用其副本，端口和用户文件夹自动分配
+        :param timeout: 等待每个浏览器启动的超时时间（秒）
+        """
+        self._options = options or ChromiumOptions()
+        self._timeout = timeout
+        self._tmp_dir = Path(gettempdir()) / 'DrissionPage' / 'BrowserPool'
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._idle = Queue()
+        self._lock = Lock()
+        self._browsers = {}  # 页面对象: (进程对象, 用户文件夹)
+        self._closed = False
+
+        size = size or cpu_count() or 1
+        with ThreadPoolExecutor(size) as executor:
+            futures = [executor.submit(self._launch) for _ in range(size)]
+
+        err = None
+        for future in futures:
+            try:
+                page = future.result()
+                self._idle.put(page)
+            except Exception as e:
+                err = err or e
+
+        if err:
+            self.close()
+            raise err
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def pages(self):
+        """返回池中所有浏览器的ChromiumPage对象"""
+        with self._lock:
+            return list(self._browsers)
+
+    @property
+    def size(self):
+        """返回浏览器数量"""
+        return len(self._browsers)
+
+    def acquire(self, timeout=None):
+        """取出一个空闲的浏览器，若其已失效则重新启动一个代替
+        :param timeout: 等待空闲浏览器的超时时间（秒），为None时一直等待
+        :return: ChromiumPage对象，超时返回None
+        """
+        if self._closed:
+            raise RuntimeError('BrowserPool已关闭。')
+        try:
+            page = self._idle.get(timeout=timeout)
+        except Empty:
+            return None
+        return page if self.is_alive(page) else self._replace(page)
+
+    def release(self, page):
+        """把取出的浏览器放回池中，池已关闭或该浏览器已被替换时不做任何事（其已在关闭或替换时退出）
+        :param page: acquire()取出的ChromiumPage对象
+        :return: None
+        """
+        with self._lock:
+            if self._closed or page not in self._browsers:
+                return
+        self._idle.put(page)
+
+    @contextmanager
+    def page(self, timeout=None):
+        """以上下文管理器方式取出一个浏览器，退出时自动放回
+        :param timeout: 等待空闲浏览器的超时时间（秒）
+        :return: ChromiumPage对象
+        """
+        page = self.acquire(timeout)
+        if page is None:
+            raise TimeoutError('等待空闲浏览器超时。')
+        try:
+            yield page
+        finally:
+            self.release(page)
+
+    def is_alive(self, page):
+        """检查浏览器进程是否仍在运行且调试接口可以访问
+        :param page: ChromiumPage对象
+        :return: bool
+        """
+        info = self._browsers.get(page)
+        if info is None or info[0].poll() is not None:
+            return False
+        try:
+            if self._options.remote_debugging_pipe:
+                return 'error' not in page.browser_driver.call_method('Browser.getVersion', _timeout=2)
+            return requests_get(f'http://{page.address}/json/version', timeout=2).ok
+        except Exception:
+            return False
+
+    def check(self):
+        """检查所有空闲的浏览器，重启已失效的
+        :return: 重启的浏览器数量
+        """
+        pages = []
+        while True:
+            try:
+                pages.append(self._idle.get_nowait())
+            except Empty:
+                break
+
+        num = 0
+        for page in pages:
+            if not self.is_alive(page):
+                page = self._replace(page)
+                num += 1
+            self._idle.put(page)
+        return num
+
+    def close(self):
+        """关闭所有浏览器并删除其用户文件夹"""
+        self._closed = True
+        with self._lock:
+            browsers = list(self._browsers.items())
+            self._browsers.clear()
+        for page, (process, path) in browsers:
+            self._quit(page, process, path)
+
+    def _launch(self):
+        """启动一个浏览器并连接
+        :return: ChromiumPage对象
+        """
+        opt = deepcopy(self._options)
+        path = mkdtemp(dir=self._tmp_dir)
+        opt.set_paths(user_data_path=path)
+        if opt.remote_debugging_pipe:  # 管道方式由页面对象启动浏览器，不占用端口
+            try:
+                page = ChromiumPage(opt)
+            except Exception:
+                rmtree(path, ignore_errors=True)
+                raise
+            process = page._process
+
+        else:
+            try:
+                address, process = launch_browser(opt, self._timeout)
+            except Exception:
+                rmtree(path, ignore_errors=True)
+                raise
+
+            opt.set_paths(local_port=address.split(':')[-1])
+            try:
+                page = ChromiumPage(opt)
+            except Exception:
+                process.kill()
+                rmtree(path, ignore_errors=True)
+                raise
+
+        with self._lock:
+            self._browsers[page] = process, path
+        return page
+
+    def _replace(self, page):
+        """关闭失效的浏览器，启动一个新的代替
+        :param page: 失效的ChromiumPage对象
+        :return: 新的ChromiumPage对象
+        """
+        with self._lock:
+            process, path = self._browsers.pop(page)
+        self._quit(page, process, path)
+        return self._launch()
+
+    @staticmethod
+    def _quit(page, process, path):
+        """关闭浏览器进程并删除其用户文件夹
+        :param page: ChromiumPage对象
+        :param process: 浏览器进程对象
+        :param path: 用户文件夹路径
+        :return: None
+        """
+        if process.poll() is None:
+            try:
+                page.run_cdp('Browser.close')
+                process.wait(5)
+            except Exception:
+                process.kill()
+                process.wait()
+
+        for driver in (page._tab_obj, page.browser_driver):
+            try:
+                driver.stop()
+            except Exception:
+                pass
+        rmtree(path, ignore_errors=True)
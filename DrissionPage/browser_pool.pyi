@@ -0,0 +1,53 @@
+# -*- coding:utf-8 -*-
+"""
+@Author  :   g1879
+@Contact :   g1879@qq.com
+"""
+from pathlib import Path
+from queue import Queue
+from subprocess import Popen
+from threading import Lock
+from typing import Dict, List, Tuple, ContextManager, Union
+
+from .chromium_page import ChromiumPage
+from .configs.chromium_options import ChromiumOptions
+
+
+class BrowserPool(object):
+    def __init__(self, size: int = None, options: ChromiumOptions = None, timeout: float = 30):
+        self._options: ChromiumOptions = ...
+        self._timeout: float = ...
+        self._tmp_dir: Path = ...
+        self._idle: Queue = ...
+        self._lock: Lock = ...
+        self._browsers: Dict[ChromiumPage, Tuple[Popen, str]] = ...
+        self._closed: bool = ...
+
+    def __enter__(self) -> BrowserPool: ...
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None: ...
+
+    @property
+    def pages(self) -> List[ChromiumPage]: ...
+
+    @property
+    def size(self) -> int: ...
+
+    def acquire(self, timeout: float = None) -> Union[ChromiumPage, None]: ...
+
+    def release(self, page: ChromiumPage) -> None: ...
+
+    def page(self, timeout: float = None) -> ContextManager[ChromiumPage]: ...
+
+    def is_alive(self, page: ChromiumPage) -> bool: ...
+
+    def check(self) -> int: ...
+
+    def close(self) -> None: ...
+
+    def _launch(self) -> ChromiumPage: ...
+
+    def _replace(self, page: ChromiumPage) -> ChromiumPage: ...
+
+    @staticmethod
+    def _quit(page: ChromiumPage, process: Popen, path: str) -> None: ...
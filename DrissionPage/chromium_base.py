@@ -3,30 +3,43 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
-from base64 import b64decode
-from json import loads, JSONDecodeError
+from asyncio import get_event_loop, wait_for, TimeoutError as AsyncTimeoutError
+from asyncio.events import _get_running_loop
+from base64 import b64decode, b64encode
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from functools import partial
+from itertools import count
+from json import loads, dumps, JSONDecodeError
 from os import sep
 from pathlib import Path
-from re import search
-from threading import Thread
+from re import search, escape, DOTALL, compile as re_compile
+from threading import Thread, Event, Condition, Lock, local
 from time import perf_counter, sleep, time
+from weakref import WeakSet
 
 from requests import Session
 
 from .base import BasePage
-from .chromium_driver import ChromiumDriver
-from .chromium_element import ChromiumScroll, ChromiumElement, run_js, make_chromium_ele
+from .chromium_driver import ChromiumDriver, AsyncChromiumDriver, ChromiumSessionDriver
+from .chromium_element import ChromiumScroll, ChromiumElement, run_js, make_chromium_ele, make_chromium_eles, \
+    extract_data, wait_dom_change
 from .commons.constants import HANDLE_ALERT_METHOD, ERROR, NoneElement
 from .commons.locator import get_loc
 from .commons.tools import get_usable_path, clean_folder
-from .commons.web import set_browser_cookies, ResponseData
+from .commons.web import set_browser_cookies, ResponseData, is_js_func
 from .errors import ContextLossError, ElementLossError, AlertExistsError, CallMethodError, TabClosedError, \
-    NoRectError, BrowserConnectError
+    NoRectError, BrowserConnectError, JavaScriptError
 from .session_element import make_session_ele
 
 
 class ChromiumBase(BasePage):
     """标签页、frame、页面基类"""
+    _load_tracker = None
+    _interceptor = None
+    _nav_group = None  # 当前document的js对象分组名称
+    _doc_backend_id = None
+    _scopes = None
 
     def __init__(self, address, tab_id=None, timeout=None):
         """
@@ -88,6 +101,7 @@ class ChromiumBase(BasePage):
         self._upload_list = None
         self._wait = None
         self._scroll = None
+        self._async_tab_obj = None
 
     def _driver_init(self, tab_id):
         """新建页面、页面刷新、切换标签页后要进行的cdp参数初始化
@@ -95,7 +109,11 @@ class ChromiumBase(BasePage):
         :return: None
         """
         self._is_loading = True
-        self._tab_obj = ChromiumDriver(tab_id=tab_id, tab_type='page', address=self.address)
+        browser_driver = self._get_flatten_driver()
+        if browser_driver:
+            self._tab_obj = ChromiumSessionDriver(tab_id=tab_id, tab_type='page', browser_driver=browser_driver)
+        else:
+            self._tab_obj = ChromiumDriver(tab_id=tab_id, tab_type='page', address=self.address)
 
         self._tab_obj.start()
         self._tab_obj.DOM.enable()
@@ -106,6 +124,13 @@ class ChromiumBase(BasePage):
         self._tab_obj.DOM.documentUpdated = self._onDocumentUpdated
         self._tab_obj.Page.loadEventFired = self._onLoadEventFired
         self._tab_obj.Page.frameNavigated = self._onFrameNavigated
+        self._tab_obj.Page.lifecycleEvent = self._onLifecycleEvent
+        self._tab_obj.Page.setLifecycleEventsEnabled(enabled=True)
+
+    def _get_flatten_driver(self):
+        """返回以flatten方式连接target所用的浏览器driver，未开启该模式时返回None"""
+        page = getattr(self, 'page', None)
+        return page._get_flatten_driver() if page is not None else None
 
     def _get_document(self):
         """刷新cdp使用的document数据"""
@@ -126,7 +151,14 @@ class ChromiumBase(BasePage):
             while perf_counter() < end_time:
                 try:
                     b_id = self.run_cdp('DOM.getDocument')['root']['backendNodeId']
-                    self._root_id = self.run_cdp('DOM.resolveNode', backendNodeId=b_id)['object']['objectId']
+                    if b_id != self._doc_backend_id:  # 新document，释放上一个document的所有js对象
+                        old_group = self._nav_group
+                        self._nav_group = ObjectGroup.new_name()
+                        self._doc_backend_id = b_id
+                        if old_group:
+                            self.driver.call_methods([('Runtime.releaseObjectGroup', {'objectGroup': old_group})])
+                    self._root_id = self.run_cdp('DOM.resolveNode', backendNodeId=b_id,
+                                                 objectGroup=self._nav_group)['object']['objectId']
                     if self._debug_recorder:
                         self._debug_recorder.add_data((perf_counter(), '信息', f'root_id：{self._root_id}'))
                     break
@@ -159,6 +191,7 @@ class ChromiumBase(BasePage):
 
         end_time = perf_counter() + timeout
         while perf_counter() < end_time:
+            self._tracker.clear_changed()
             state = self.ready_state
             if state is None:  # 存在alert的情况
                 return None
@@ -174,7 +207,7 @@ class ChromiumBase(BasePage):
             elif self.page_load_strategy == 'none':
                 self.stop_loading()
                 return True
-            sleep(.1)
+            self._tracker.wait_changed(end_time - perf_counter())
 
         self.stop_loading()
         return False
@@ -199,6 +232,10 @@ class ChromiumBase(BasePage):
 
             self._get_document()
 
+    def _onLifecycleEvent(self, **kwargs):
+        """页面生命周期变化时触发，唤醒等待中的方法"""
+        self._tracker.notify()
+
     def _onLoadEventFired(self, **kwargs):
         """在页面刷新、变化后重新读取页面内容"""
         if self._debug:
@@ -250,11 +287,75 @@ class ChromiumBase(BasePage):
             raise RuntimeError('浏览器已关闭或链接已断开。')
         return self._tab_obj
 
+    @property
+    def async_driver(self):
+        """返回用于以异步方式控制当前标签页的AsyncChromiumDriver对象，切换标签页或事件循环后重新创建"""
+        driver = self._async_tab_obj
+        loop = _get_running_loop()
+        if driver is not None and driver._loop is not None:
+            if driver._loop.is_closed() or (loop is not None and driver._loop is not loop):
+                driver = None  # 连接和future绑定在创建时的事件循环中，不能在其它事件循环中使用
+
+        if driver is None or driver.id != self.tab_id:
+            browser_driver = self._get_flatten_driver()
+            if browser_driver is not None and browser_driver._pipe:
+                raise RuntimeError('以管道方式连接的浏览器不能使用异步driver。')
+            if self._async_tab_obj is not None:  # 切换了标签页或事件循环，关闭旧的连接
+                self._async_tab_obj.stop_soon()
+            self._async_tab_obj = AsyncChromiumDriver(tab_id=self.tab_id, tab_type='page', address=self.address)
+        return self._async_tab_obj
+
     @property
     def is_loading(self):
         """返回页面是否正在加载状态"""
         return self._is_loading
 
+    @property
+    def _is_loading(self):
+        """返回页面是否正在加载状态"""
+        return self._tracker.is_loading
+
+    @_is_loading.setter
+    def _is_loading(self, on_off):
+        """设置页面加载状态，并唤醒等待该状态的方法"""
+        self._tracker.set_loading(on_off)
+
+    @property
+    def _tracker(self):
+        """返回记录页面加载状态的对象"""
+        if self._load_tracker is None:
+            self._load_tracker = LoadTracker()
+        return self._load_tracker
+
+    @property
+    def _scope_stack(self):
+        """返回当前线程中已进入的ObjectGroup对象列表"""
+        if self._scopes is None:
+            self._scopes = local()
+        stack = getattr(self._scopes, 'stack', None)
+        if stack is None:
+            stack = self._scopes.stack = []
+        return stack
+
+    @property
+    def _object_group(self):
+        """返回新建的js对象所属的分组名称"""
+        stack = self._scope_stack
+        if stack:
+            return stack[-1].name
+        if self._nav_group is None:
+            self._nav_group = ObjectGroup.new_name()
+        return self._nav_group
+
+    def _track_ele(self, ele):
+        """记录在当前ObjectGroup中获取了object id的元素对象，以便退出时重置
+        :param ele: ChromiumElement对象
+        :return: None
+        """
+        stack = self._scope_stack
+        if stack:
+            stack[-1].add_ele(ele)
+
     @property
     def is_alive(self):
         """返回页面对象是否仍然可用"""
@@ -355,6 +456,13 @@ class ChromiumBase(BasePage):
             self._wait = ChromiumBaseWaiter(self)
         return self._wait
 
+    @property
+    def listen(self):
+        """返回用于监听数据包的对象，和wait.set_targets()等方法共用"""
+        if self.wait._listener is None:
+            self.wait._listener = NetworkListener(self)
+        return self.wait._listener
+
     @property
     def set(self):
         """返回用于等待的对象"""
@@ -369,6 +477,13 @@ class ChromiumBase(BasePage):
             self._screencast = Screencast(self)
         return self._screencast
 
+    def scope(self):
+        """返回一个js对象分组，用with使用，其中新建的js对象和查找结果在退出时一次释放
+        例：with page.scope(): ...
+        :return: ObjectGroup对象
+        """
+        return ObjectGroup(self)
+
     def run_cdp(self, cmd, **cmd_args):
         """执行Chrome DevTools Protocol语句
         :param cmd: 协议项目
@@ -378,12 +493,41 @@ class ChromiumBase(BasePage):
         if self.driver.has_alert and cmd != HANDLE_ALERT_METHOD:
             raise AlertExistsError
 
-        r = self.driver.call_method(cmd, **cmd_args)
+        return self._check_cdp_result(self.driver.call_method(cmd, **cmd_args))
+
+    def run_cdp_many(self, cmds):
+        """一次发送多条Chrome DevTools Protocol语句，在一次往返中取得所有结果
+        :param cmds: 由(协议项目, 参数dict)组成的列表，无参数时可只传协议项目
+        :return: 执行结果组成的列表，顺序与cmds一致
+        """
+        if self.driver.has_alert and any((i if isinstance(i, str) else i[0]) != HANDLE_ALERT_METHOD for i in cmds):
+            raise AlertExistsError
+
+        return [self._check_cdp_result(r) for r in self.driver.call_methods(cmds)]
+
+    async def async_run_cdp(self, cmd, **cmd_args):
+        """以异步方式执行Chrome DevTools Protocol语句
+        :param cmd: 协议项目
+        :param cmd_args: 参数
+        :return: 执行的结果
+        """
+        driver = self.async_driver
+        if driver.has_alert and cmd != HANDLE_ALERT_METHOD:
+            raise AlertExistsError
+
+        return self._check_cdp_result(await driver.call_method(cmd, **cmd_args))
+
+    def _check_cdp_result(self, r):
+        """检查cdp执行结果，出错时抛出对应异常
+        :param r: 执行cdp返回的数据
+        :return: 执行的结果
+        """
         if ERROR not in r:
             return r
 
         error = r[ERROR]
-        if error in ('Cannot find context with specified id', 'Inspected target navigated or closed'):
+        if error in ('Cannot find context with specified id', 'Inspected target navigated or closed',
+                     'Execution context was destroyed.'):  # 等待promise期间页面跳转
             raise ContextLossError
         elif error in ('Could not find node with given id', 'Could not find object with given id',
                        'No node with given id found', 'Node with given id does not belong to the document',
@@ -438,6 +582,66 @@ class ChromiumBase(BasePage):
         from threading import Thread
         Thread(target=run_js, args=(self, script, as_expr, self.timeouts.script, args)).start()
 
+    async def async_run_js(self, script, *args, as_expr=False):
+        """以异步方式运行javascript代码，结果以值的形式返回，不能返回元素对象
+        :param script: js文本
+        :param args: 参数，按顺序在js文本中对应argument[0]、argument[1]...，只能是可转为json的值
+        :param as_expr: 是否作为表达式运行，为True时args无效
+        :return: 运行的结果
+        """
+        if not as_expr:
+            if not is_js_func(script):
+                script = f'function(){{{script}}}'
+            script = f'({script}).apply(document, {dumps(list(args))});'
+
+        res = await self.async_run_cdp('Runtime.evaluate', expression=script, returnByValue=True,
+                                       awaitPromise=True, userGesture=True, timeout=self.timeouts.script * 1000)
+        if res is None:  # 存在alert的情况
+            return None
+
+        exceptionDetails = res.get('exceptionDetails')
+        if exceptionDetails:
+            raise JavaScriptError(f'\njavascript运行错误：\n{script}\n错误信息: \n{exceptionDetails}')
+
+        result = res['result']
+        if 'unserializableValue' in result:
+            return result['unserializableValue']
+        return result.get('value', None)
+
+    async def async_get(self, url, show_errmsg=False, timeout=None):
+        """以异步方式访问url，按页面加载策略等待加载完成
+        :param url: 目标url
+        :param show_errmsg: 是否显示和抛出异常
+        :param timeout: 连接超时时间
+        :return: 目标url是否可用
+        """
+        self._before_connect(url, 0, 0)
+        timeout = timeout if timeout is not None else self.timeouts.page_load
+        driver = self.async_driver
+        await driver.call_method('Page.enable')
+
+        event = 'Page.domContentEventFired' if self.page_load_strategy == 'eager' else 'Page.loadEventFired'
+        loaded = get_event_loop().create_future()
+        driver.set_listener(event, lambda **kwargs: loaded.done() or loaded.set_result(True))
+
+        err = None
+        try:
+            result = await self.async_run_cdp('Page.navigate', url=self._url)
+            if 'errorText' in result:
+                err = ConnectionError(result['errorText'])
+            elif self.page_load_strategy != 'none':
+                await wait_for(loaded, timeout)
+        except AsyncTimeoutError:
+            await self.async_run_cdp('Page.stopLoading')
+            err = TimeoutError('页面连接超时。')
+        finally:
+            driver.set_listener(event, None)
+
+        self._url_available = err is None
+        if err and show_errmsg:
+            raise err
+        return self._url_available
+
     def get(self, url, show_errmsg=False, retry=None, interval=None, timeout=None):
         """访问url
         :param url: 目标url
@@ -503,6 +707,16 @@ class ChromiumBase(BasePage):
         """
         return make_session_ele(self, loc_or_str, single=False)
 
+    def extract(self, loc_or_str, fields='text', timeout=None):
+        """在一次js调用中获取所有符合条件的元素的数据，比逐个读取元素属性快得多
+        :param loc_or_str: 元素的定位信息，可以是loc元组，或查询字符串
+        :param fields: 要获取的数据项，为str时返回由值组成的列表，为list或tuple时以各项为键，为dict时以键为名、值为数据项；
+                       数据项可以是'text'、'raw_text'、'html'、'inner_html'、'tag'、'link'、'href'、'src'、'attrs'或attribute名称
+        :param timeout: 等待元素出现的超时时间
+        :return: 每个元素的数据组成的列表
+        """
+        return extract_data(self, loc_or_str, fields, timeout)
+
     def _find_elements(self, loc_or_ele, timeout=None, single=True, relative=False, raise_err=None):
         """执行元素查找
         :param loc_or_ele: 定位符或元素对象
@@ -521,57 +735,61 @@ class ChromiumBase(BasePage):
 
         ok = False
         nodeIds = None
+        search_ids = []  # 所有查找结果在返回前一次丢弃
 
         timeout = timeout if timeout is not None else self.timeout
         end_time = perf_counter() + timeout
 
         try:
             search_result = self.run_cdp_loaded('DOM.performSearch', query=loc, includeUserAgentShadowDOM=True)
+            search_ids.append(search_result['searchId'])
             count = search_result['resultCount']
         except ContextLossError:
             search_result = None
             count = 0
 
-        while True:
-            if count > 0:
-                count = 1 if single else count
-                try:
-                    nodeIds = self.run_cdp_loaded('DOM.getSearchResults', searchId=search_result['searchId'],
-                                                  fromIndex=0, toIndex=count)
-                    if nodeIds['nodeIds'][0] != 0:
-                        ok = True
-
-                except Exception:
-                    pass
+        try:
+            while True:
+                if count > 0:
+                    count = 1 if single else count
+                    try:
+                        nodeIds = self.run_cdp_loaded('DOM.getSearchResults', searchId=search_result['searchId'],
+                                                      fromIndex=0, toIndex=count)
+                        if nodeIds['nodeIds'][0] != 0:
+                            ok = True
+
+                    except Exception:
+                        pass
+
+                if ok:
+                    try:
+                        if single:
+                            return make_chromium_ele(self, node_id=nodeIds['nodeIds'][0])
+                        else:
+                            return make_chromium_eles(self, nodeIds['nodeIds'])
+
+                    except ElementLossError:
+                        ok = False
 
-            if ok:
                 try:
-                    if single:
-                        r = make_chromium_ele(self, node_id=nodeIds['nodeIds'][0])
-                        break
-                    else:
-                        r = [make_chromium_ele(self, node_id=i) for i in nodeIds['nodeIds']]
-                        break
-
-                except ElementLossError:
-                    ok = False
-
-            try:
-                search_result = self.run_cdp_loaded('DOM.performSearch', query=loc, includeUserAgentShadowDOM=True)
-                count = search_result['resultCount']
-            except ContextLossError:
-                pass
+                    search_result = self.run_cdp_loaded('DOM.performSearch', query=loc, includeUserAgentShadowDOM=True)
+                    search_ids.append(search_result['searchId'])
+                    count = search_result['resultCount']
+                except ContextLossError:
+                    pass
 
-            if perf_counter() >= end_time:
-                return NoneElement() if single else []
+                if perf_counter() >= end_time:
+                    return NoneElement() if single else []
 
-            sleep(.1)
+                # dom变化时立即重新查找，最多等0.5秒，以应对frame和shadow root内的变化
+                wait_dom_change(self, self._root_id, min(end_time - perf_counter(), .5))
 
-        try:
-            self.run_cdp('DOM.discardSearchResults', searchId=search_result['searchId'])
-        except:
-            pass
-        return r
+        finally:
+            if search_ids:
+                try:
+                    self.driver.call_methods([('DOM.discardSearchResults', {'searchId': i}) for i in search_ids])
+                except Exception:
+                    pass
 
     def refresh(self, ignore_cache=False):
         """刷新当前页面
@@ -630,8 +848,11 @@ class ChromiumBase(BasePage):
                 self._debug_recorder.add_data((perf_counter(), '操作', '停止页面加载'))
 
         self.run_cdp('Page.stopLoading')
-        while self.ready_state not in ('complete', None):
-            sleep(.1)
+        while True:
+            self._tracker.clear_changed()
+            if self.ready_state in ('complete', None):
+                break
+            self._tracker.wait_changed()
 
     def remove_ele(self, loc_or_ele):
         """从页面上删除一个元素
@@ -745,6 +966,57 @@ class ChromiumBase(BasePage):
         return self._get_screenshot(path=path, as_bytes=as_bytes, as_base64=as_base64,
                                     full_page=full_page, left_top=left_top, right_bottom=right_bottom)
 
+    def get_screenshots(self, eles, path=None, pic_type='png', as_bytes=False, as_base64=False):
+        """对多个元素截图，一次获取所有元素位置，截取一次页面后在本地裁剪，未安装Pillow时改为在一次往返中逐个截取
+        :param eles: 元素对象或定位符组成的列表，元素须在当前页面中
+        :param path: 保存图片的文件夹路径，为None时保存到当前文件夹
+        :param pic_type: 图片格式，可选 'jpg','jpeg','png','webp'
+        :param as_bytes: 是否以字节形式返回图片，为True时path参数无效
+        :param as_base64: 是否以base64字符串形式返回图片，为True时path参数无效
+        :return: 图片完整路径、字节或base64文本组成的列表，顺序与eles一致
+        """
+        if pic_type not in ('jpg', 'jpeg', 'png', 'webp'):
+            raise ValueError("只能接收 'jpg', 'jpeg', 'png', 'webp' 四种格式。")
+        pic_type = 'jpeg' if pic_type == 'jpg' else pic_type
+        eles = [self._ele(i) if isinstance(i, (str, tuple)) else i for i in eles]
+        if not eles:
+            return []
+
+        self.wait.load_complete()
+        cmds = [('DOM.getBoxModel', {'backendNodeId': i.ids.backend_id}) for i in eles]
+        cmds.append('Page.getLayoutMetrics')
+        r = self.run_cdp_many(cmds)
+        sx, sy = r[-1]['visualViewport']['pageX'], r[-1]['visualViewport']['pageY']
+        rects = []
+        for m in r[:-1]:
+            m = m['model']
+            x, y = m['border'][0] + sx, m['border'][1] + sy
+            rects.append((x, y, max(m['width'], 1), max(m['height'], 1)))
+
+        try:
+            pics = _crop_screenshots(self, rects, pic_type)
+        except ModuleNotFoundError:
+            cmds = [('Page.captureScreenshot', {'format': pic_type, 'captureBeyondViewport': True,
+                                                'clip': {'x': x, 'y': y, 'width': w, 'height': h, 'scale': 1}})
+                    for x, y, w, h in rects]
+            pics = [b64decode(i['data']) for i in self.run_cdp_many(cmds)]
+
+        if as_bytes:
+            return pics
+        if as_base64:
+            return [b64encode(i).decode() for i in pics]
+
+        path = Path(path or '.')
+        path.mkdir(parents=True, exist_ok=True)
+        suffix = 'jpg' if pic_type == 'jpeg' else pic_type
+        result = []
+        for ele, pic in zip(eles, pics):
+            file = get_usable_path(path / f'{ele.tag}.{suffix}')
+            with open(file, 'wb') as f:
+                f.write(pic)
+            result.append(str(file.absolute()))
+        return result
+
     def clear_cache(self, session_storage=True, local_storage=True, cache=True, cookies=True):
         """清除缓存，可选要清除的项
         :param session_storage: 是否清除sessionStorage
@@ -888,6 +1160,22 @@ class ChromiumBaseSetter(object):
         """返回用于设置页面滚动设置的对象"""
         return PageScrollSetter(self._page.scroll)
 
+    @property
+    def intercept(self):
+        """返回用于设置请求拦截规则的对象，只对当前tab有效"""
+        if self._page._interceptor is None:
+            self._page._interceptor = Interceptor(self._page)
+        return self._page._interceptor
+
+    def event_dispatch(self, max_size=None, policy=None, by_domain=None):
+        """设置当前tab执行事件回调方法的方式，参数为None时不修改
+        :param max_size: 每条通道最多积压的事件数，为0时不限制
+        :param policy: 通道已满时的处理方式，'drop'丢弃新事件（Fetch和弹窗等须回应的事件除外），'warn'仍放入并发出警告
+        :param by_domain: 是否按域分通道并行执行，为False时所有事件按顺序执行
+        :return: None
+        """
+        self._page.driver.dispatcher.set(max_size, policy, by_domain)
+
     def retry_times(self, times):
         """设置连接失败重连次数"""
         self._page.retry_times = times
@@ -1027,21 +1315,16 @@ class ChromiumBaseWaiter(object):
             sleep(.01)
 
     def _loading(self, timeout=None, start=True, gap=.01):
-        """等待页面开始加载或加载完成
+        """等待页面开始加载或加载完成，状态变化时立即返回
         :param timeout: 超时时间，为None时使用页面timeout属性
         :param start: 等待开始还是结束
-        :param gap: 间隔秒数
+        :param gap: 已无作用，保留以兼容旧代码
         :return: 是否等待成功
         """
         if timeout != 0:
             if timeout is None or timeout is True:
                 timeout = self._driver.timeout
-            end_time = perf_counter() + timeout
-            while perf_counter() < end_time:
-                if self._driver.is_loading == start:
-                    return True
-                sleep(gap)
-            return False
+            return self._driver._tracker.wait_loading(start, timeout)
 
     def set_targets(self, targets, is_regex=False):
         """指定要等待的数据包
@@ -1070,7 +1353,65 @@ class ChromiumBaseWaiter(object):
         self._listener.stop()
 
 
+class LoadTracker(object):
+    """记录页面加载状态，由cdp事件驱动，等待的线程在状态变化时立即被唤醒"""
+
+    def __init__(self):
+        self._is_loading = None
+        self._started = Event()
+        self._stopped = Event()
+        self._changed = Event()
+
+    @property
+    def is_loading(self):
+        """返回是否正在加载"""
+        return self._is_loading
+
+    def set_loading(self, on_off):
+        """设置加载状态
+        :param on_off: True为正在加载，False为加载完成，None为未知
+        :return: None
+        """
+        self._is_loading = on_off
+        if on_off:
+            self._stopped.clear()
+            self._started.set()
+        elif on_off is False:
+            self._started.clear()
+            self._stopped.set()
+        else:
+            self._started.clear()
+            self._stopped.clear()
+        self._changed.set()
+
+    def notify(self):
+        """通知等待者页面状态可能已变化"""
+        self._changed.set()
+
+    def clear_changed(self):
+        """清除状态变化标记，在检查状态前调用"""
+        self._changed.clear()
+
+    def wait_changed(self, timeout=.5):
+        """等待页面状态变化，超时也返回，以防漏掉未发出事件的变化
+        :param timeout: 最长等待秒数，最多0.5秒
+        :return: 是否收到变化通知
+        """
+        return self._changed.wait(max(min(timeout, .5), 0))
+
+    def wait_loading(self, start=True, timeout=None):
+        """等待页面开始加载或加载完成
+        :param start: 等待开始还是结束
+        :param timeout: 超时时间，为None时一直等待
+        :return: 是否等待成功
+        """
+        return (self._started if start else self._stopped).wait(timeout)
+
+
 class NetworkListener(object):
+    _body_pool = None  # 所有监听器共用的获取body线程池
+    _body_pool_lock = Lock()
+
     def __init__(self, page):
         self._page = page
         self._targets = None
@@ -1078,11 +1419,35 @@ class NetworkListener(object):
         self._results = {}
         self._single = False
         self._requests = {}
+        self._cond = Condition()
+        self._buffer = deque(maxlen=1000)  # 流式获取用的环形缓冲区
+        self._counts = {}
+        self._dropped = 0
+        self._body_mode = 'async'
+        self._max_body_size = None
+        self._futures = set()  # 尚未完成的获取body任务
 
-    def set_targets(self, targets, is_regex=False):
+    @property
+    def counts(self):
+        """返回每个监听目标捕获到的数据包数量"""
+        with self._cond:
+            return dict(self._counts)
+
+    @property
+    def dropped(self):
+        """返回因缓冲区已满而被丢弃的数据包数量"""
+        return self._dropped
+
+    @property
+    def pending(self):
+        """返回已匹配但尚未完成的请求数量"""
+        return len(self._requests)
+
+    def set_targets(self, targets, is_regex=False, buffer_size=None):
         """指定要等待的数据包
         :param targets: 要匹配的数据包url特征，可用list等传入多个
         :param is_regex: 设置的target是否正则表达式
+        :param buffer_size: 供steps()读取的缓冲区大小，已满时丢弃最旧的数据包，为None时不改变大小
         :return: None
         """
         if not isinstance(targets, (str, list, tuple, set)):
@@ -1094,20 +1459,61 @@ class NetworkListener(object):
         else:
             self._targets = set(targets)
             self._single = False
+
+        with self._cond:
+            self._buffer = deque(maxlen=buffer_size or self._buffer.maxlen)
+            self._counts = {}
+            self._dropped = 0
+
         self._page.run_cdp('Network.enable')
         if targets is not None:
             self._page.driver.Network.requestWillBeSent = self._requestWillBeSent
             self._page.driver.Network.responseReceived = self._response_received
             self._page.driver.Network.loadingFinished = self._loading_finished
+            self._page.driver.Network.loadingFailed = self._loading_failed
         else:
             self.stop()
 
+    def set_body_mode(self, mode='async', max_size=None):
+        """设置获取数据包body的方式，body均不在事件线程中获取，以免阻塞其它事件
+        :param mode: 'async'：数据包完成后由后台线程获取；'lazy'：第一次读取body时才获取；'none'：不获取
+        :param max_size: body超过此大小（字节）时不获取，为None时不限制
+        :return: None
+        """
+        if mode not in ('async', 'lazy', 'none'):
+            raise ValueError("mode只能是'async'、'lazy'、'none'。")
+        self._body_mode = mode
+        self._max_body_size = max_size
+
     def stop(self):
-        """停止监听数据包"""
+        """停止监听数据包，尚未获取的body不再获取，读取时为None"""
+        for future in list(self._futures):
+            future.cancel()
+        self._futures.clear()
         self._page.run_cdp('Network.disable')
         self._page.driver.Network.requestWillBeSent = None
         self._page.driver.Network.responseReceived = None
         self._page.driver.Network.loadingFinished = None
+        self._page.driver.Network.loadingFailed = None
+        self._requests = {}
+
+    def steps(self, count=None, timeout=None):
+        """逐个返回捕获到的数据包，没有数据包时阻塞等待
+        :param count: 需要获取的数据包数量，为None时不限数量
+        :param timeout: 等待下一个数据包的超时时间（秒），超时则结束，为None时一直等待
+        :return: ResponseData对象生成器
+        """
+        if self._targets is None:
+            raise RuntimeError('必须先用set_targets()设置等待目标。')
+
+        num = 0
+        while count is None or num < count:
+            with self._cond:
+                if not self._cond.wait_for(lambda: self._buffer, timeout):
+                    return
+                packet = self._buffer.popleft()
+            yield packet
+            num += 1
 
     def listen(self, timeout=None, any_one=False):
         """等待指定数据包加载完成
@@ -1119,17 +1525,12 @@ class NetworkListener(object):
             raise RuntimeError('必须先用set_targets()设置等待目标。')
 
         timeout = timeout if timeout is not None else self._page.timeout
-        end_time = perf_counter() + timeout
-        while perf_counter() < end_time:
-            if self._results and (any_one or set(self._results) == self._targets):
-                break
-            sleep(.1)
-
-        self._requests = {}
-        if not self._results:
-            return False
-        r = list(self._results.values())[0] if self._single else self._results
-        self._results = {}
+        with self._cond:
+            self._cond.wait_for(lambda: self._results and (any_one or set(self._results) == self._targets), timeout)
+            if not self._results:
+                return False
+            r = list(self._results.values())[0] if self._single else self._results
+            self._results = {}
         return r
 
     def _response_received(self, **kwargs):
@@ -1140,23 +1541,68 @@ class NetworkListener(object):
     def _loading_finished(self, **kwargs):
         """请求完成时处理方法"""
         request_id = kwargs['requestId']
-        request = self._requests.get(request_id)
+        request = self._requests.pop(request_id, None)
         if request:
-            try:
-                r = self._page.run_cdp('Network.getResponseBody', requestId=request_id)
-                body = r['body']
-                is_base64 = r['base64Encoded']
-            except CallMethodError:
-                body = ''
-                is_base64 = False
-
             target = request['target']
-            rd = ResponseData(request_id, request['response'], body, self._page.tab_id, target)
+            rd = ResponseData(request_id, request['response'], '', self._page.tab_id, target)
             rd.method = request['method']
             rd.postData = request['post_data']
-            rd._base64_body = is_base64
             rd.requestHeaders = request['request_headers']
-            self._results[target] = rd
+            rd._page = self._page
+            rd._frame_id = request['frame_id']
+
+            size = kwargs.get('encodedDataLength', 0)
+            if self._body_mode == 'none' or (self._max_body_size is not None and size > self._max_body_size):
+                rd._rawBody = None  # 未获取的body可用save()以流方式保存
+            elif self._body_mode == 'lazy':
+                rd._body_loader = partial(self._get_body, request_id)
+            else:
+                future = self._get_body_pool().submit(self._get_body, request_id)
+                self._futures.add(future)
+                future.add_done_callback(self._futures.discard)
+                rd._body_loader = partial(self._wait_body, future)
+            with self._cond:
+                self._results[target] = rd
+                if len(self._buffer) == self._buffer.maxlen:
+                    self._dropped += 1
+                self._buffer.append(rd)
+                self._counts[target] = self._counts.get(target, 0) + 1
+                self._cond.notify_all()
+
+    def _get_body(self, request_id):
+        """获取数据包的body
+        :param request_id: 请求id
+        :return: body和是否base64编码组成的元组，无法获取时body为None
+        """
+        try:
+            r = self._page.run_cdp('Network.getResponseBody', requestId=request_id)
+            return r['body'], r['base64Encoded']
+        except CallMethodError:
+            return None, False
+
+    @staticmethod
+    def _wait_body(future):
+        """等待后台获取body的任务完成
+        :param future: 获取body的任务
+        :return: body和是否base64编码组成的元组，任务已被stop()取消时body为None
+        """
+        try:
+            return future.result()
+        except CancelledError:
+            return None, False
+
+    @classmethod
+    def _get_body_pool(cls):
+        """返回共用的获取body线程池，避免每个标签页各自创建线程"""
+        if cls._body_pool is None:
+            with cls._body_pool_lock:
+                if cls._body_pool is None:
+                    cls._body_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='DrissionPageBody')
+        return cls._body_pool
+
+    def _loading_failed(self, **kwargs):
+        """请求失败时处理方法"""
+        self._requests.pop(kwargs['requestId'], None)
 
     def _requestWillBeSent(self, **kwargs):
         """接收到请求时的回调函数"""
@@ -1166,10 +1612,260 @@ class NetworkListener(object):
                 self._requests[kwargs['requestId']] = {'target': target,
                                                        'method': kwargs['request']['method'],
                                                        'post_data': kwargs['request'].get('postData', None),
-                                                       'request_headers': kwargs['request']['headers']}
+                                                       'request_headers': kwargs['request']['headers'],
+                                                       'frame_id': kwargs.get('frameId', None)}
                 break
 
 
+class Interceptor(object):
+    """基于Fetch域的请求拦截器，可按url和资源类型屏蔽、模拟请求或改写请求headers，规则可随时修改"""
+    RESOURCE_TYPES = ('Document', 'Stylesheet', 'Image', 'Media', 'Font', 'Script', 'TextTrack', 'XHR', 'Fetch',
+                      'Prefetch', 'EventSource', 'WebSocket', 'Manifest', 'SignedExchange', 'Ping',
+                      'CSPViolationReport', 'Preflight', 'Other')
+
+    def __init__(self, page):
+        """
+        :param page: ChromiumBase对象
+        """
+        self._page = page
+        self._rules = []
+        self._compiled = {}  # 资源类型: 编译后的规则正则
+        self._types = {i.lower(): i for i in self.RESOURCE_TYPES}
+
+    @property
+    def rules(self):
+        """返回当前所有规则"""
+        return [dict(i) for i in self._rules]
+
+    def block(self, *patterns, resource_types=None):
+        """屏蔽匹配的请求
+        :param patterns: url特征，可用*作通配符，不含*时匹配包含该文本的url
+        :param resource_types: 资源类型，如'Image'、'Font'，可用list等传入多个，为None时匹配所有类型
+        :return: 当前对象
+        """
+        for pattern in patterns:
+            self._add_rule(pattern, resource_types, 'block')
+        return self
+
+    def block_types(self, *resource_types):
+        """屏蔽指定类型的所有资源
+        :param resource_types: 资源类型，如'Image'、'Font'、'Media'
+        :return: 当前对象
+        """
+        return self.block('*', resource_types=resource_types)
+
+    def mock(self, pattern, path=None, body=None, status=200, headers=None, resource_types=None):
+        """不发送匹配的请求，直接用本地文件或指定内容作为响应
+        :param pattern: url特征，可用*作通配符，不含*时匹配包含该文本的url
+        :param path: 作为响应内容的本地文件路径
+        :param body: 作为响应内容的文本或bytes，path不为None时无效
+        :param status: 响应状态码
+        :param headers: 响应headers，dict格式
+        :param resource_types: 资源类型，可用list等传入多个，为None时匹配所有类型
+        :return: 当前对象
+        """
+        headers = dict(headers or {})
+        if path is not None:
+            path = str(Path(path).absolute())
+            if not any(k.lower() == 'content-type' for k in headers):
+                from mimetypes import guess_type
+                mime = guess_type(path)[0]
+                if mime:
+                    headers['Content-Type'] = mime
+        self._add_rule(pattern, resource_types, 'mock', path=path, body=body, status=status, headers=headers)
+        return self
+
+    def headers(self, pattern, headers, resource_types=None):
+        """改写匹配请求的headers
+        :param pattern: url特征，可用*作通配符，不含*时匹配包含该文本的url
+        :param headers: 要设置的headers，dict格式，值为None时删除该项
+        :param resource_types: 资源类型，可用list等传入多个，为None时匹配所有类型
+        :return: 当前对象
+        """
+        self._add_rule(pattern, resource_types, 'headers', headers=dict(headers))
+        return self
+
+    def remove(self, pattern):
+        """删除某个url特征的所有规则
+        :param pattern: 设置规则时使用的url特征
+        :return: 当前对象
+        """
+        self._rules = [i for i in self._rules if i['pattern'] != pattern]
+        self._apply()
+        return self
+
+    def clear(self):
+        """删除所有规则并停止拦截"""
+        self._rules = []
+        self._apply()
+
+    def match(self, url, resource_type=None):
+        """返回url首个匹配的规则
+        :param url: 请求url
+        :param resource_type: 资源类型
+        :return: 规则字典，没有匹配时返回None
+        """
+        regex = self._compiled.get(resource_type, False)
+        if regex is False:
+            regex = self._compiled[resource_type] = self._compile(resource_type)
+        if regex is None:
+            return None
+        r = regex.fullmatch(url)
+        return self._rules[int(r.lastgroup[1:])] if r else None
+
+    def _add_rule(self, pattern, resource_types, action, **kwargs):
+        """添加一条规则并使其生效
+        :param pattern: url特征
+        :param resource_types: 资源类型
+        :param action: 'block'、'mock'或'headers'
+        :param kwargs: 规则的其它参数
+        :return: None
+        """
+        if isinstance(resource_types, str):
+            resource_types = (resource_types,)
+        types = []
+        for t in resource_types or ():
+            if t.lower() not in self._types:
+                raise ValueError(f'资源类型不正确：{t}')
+            types.append(self._types[t.lower()])
+
+        if '*' not in pattern:
+            pattern_txt = f'*{pattern}*'
+        else:
+            pattern_txt = pattern
+        kwargs.update({'pattern': pattern, 'types': tuple(types), 'action': action,
+                       'regex': '.*'.join(escape(i) for i in pattern_txt.split('*')),
+                       'url_pattern': pattern_txt.replace('\\', '\\\\').replace('?', '\\?')})
+        self._rules.append(kwargs)
+        self._apply()
+
+    def _compile(self, resource_type):
+        """把适用于某资源类型的所有规则编译成一个正则，按规则添加顺序优先匹配
+        :param resource_type: 资源类型
+        :return: 编译后的正则对象，没有适用规则时返回None
+        """
+        parts = [f'(?P<r{n}>{i["regex"]})' for n, i in enumerate(self._rules)
+                 if not i['types'] or resource_type in i['types']]
+        return re_compile('|'.join(parts), DOTALL) if parts else None
+
+    def _apply(self):
+        """使当前规则生效，浏览器只暂停可能匹配的请求"""
+        self._compiled = {}
+        if not self._rules:
+            self._page.driver.Fetch.requestPaused = None
+            self._page.run_cdp('Fetch.disable')
+            return
+
+        patterns = []
+        for rule in self._rules:
+            for t in rule['types'] or (None,):
+                pattern = {'urlPattern': rule['url_pattern'], 'requestStage': 'Request'}
+                if t:
+                    pattern['resourceType'] = t
+                if pattern not in patterns:
+                    patterns.append(pattern)
+
+        self._page.driver.Fetch.requestPaused = self._on_request_paused
+        self._page.run_cdp('Fetch.enable', patterns=patterns)
+
+    def _on_request_paused(self, **kwargs):
+        """请求被暂停时按规则处理"""
+        request_id = kwargs['requestId']
+        request = kwargs['request']
+        rule = self.match(request['url'], kwargs.get('resourceType', None))
+        try:
+            if rule is None:
+                self._page.run_cdp('Fetch.continueRequest', requestId=request_id)
+
+            elif rule['action'] == 'block':
+                self._page.run_cdp('Fetch.failRequest', requestId=request_id, errorReason='BlockedByClient')
+
+            elif rule['action'] == 'mock':
+                if rule['path'] is not None:
+                    body = Path(rule['path']).read_bytes()
+                else:
+                    body = rule['body'] or b''
+                    body = body.encode('utf-8') if isinstance(body, str) else body
+                headers = [{'name': k, 'value': str(v)} for k, v in rule['headers'].items()]
+                self._page.run_cdp('Fetch.fulfillRequest', requestId=request_id, responseCode=rule['status'],
+                                   responseHeaders=headers, body=b64encode(body).decode())
+
+            else:
+                headers = dict(request.get('headers', {}))
+                lower = {k.lower(): k for k in headers}
+                for k, v in rule['headers'].items():
+                    headers.pop(lower.get(k.lower(), k), None)
+                    if v is not None:
+                        headers[k] = str(v)
+                self._page.run_cdp('Fetch.continueRequest', requestId=request_id,
+                                   headers=[{'name': k, 'value': v} for k, v in headers.items()])
+
+        except Exception:
+            try:
+                self._page.run_cdp('Fetch.continueRequest', requestId=request_id)
+            except Exception:
+                pass
+
+
+class ObjectGroup(object):
+    """页面中js远程对象的分组，退出时用Runtime.releaseObjectGroup一次释放组内所有对象"""
+    _ids = count(1)
+
+    def __init__(self, page):
+        """
+        :param page: ChromiumBase对象
+        """
+        self._page = page
+        self.name = self.new_name()
+        self._eles = WeakSet()
+
+    def __enter__(self):
+        self._page._scope_stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        stack = self._page._scope_stack
+        if self in stack:
+            stack.remove(self)
+        self.release()
+
+    @classmethod
+    def new_name(cls):
+        """返回一个新的分组名称，在进程内唯一"""
+        return f'DrissionPage-{next(cls._ids)}'
+
+    def add_ele(self, ele):
+        """记录object id属于本组的元素对象
+        :param ele: ChromiumElement对象
+        :return: None
+        """
+        self._eles.add(ele)
+
+    def release(self):
+        """释放组内所有js对象，组内获取的元素对象在下次使用时重新获取object id
+        :return: None
+        """
+        eles = [i for i in self._eles if i._id_cache['obj_id']]
+        self._eles.clear()
+
+        # 只有object id的元素先取得backend id，以便释放后仍能使用
+        todo = [i for i in eles if not (i._id_cache['backend_id'] or i._id_cache['node_id'])]
+        cmds = [('DOM.describeNode', {'objectId': i._id_cache['obj_id']}) for i in todo]
+        cmds.append(('Runtime.releaseObjectGroup', {'objectGroup': self.name}))
+        try:
+            results = self._page.driver.call_methods(cmds)
+        except RuntimeError:  # 浏览器已断开
+            return
+
+        for ele, r in zip(todo, results):
+            if ERROR not in r:
+                ele._id_cache['backend_id'] = r['node']['backendNodeId']
+        for ele in eles:
+            if ele._id_cache['backend_id'] or ele._id_cache['node_id']:
+                ele._id_cache['obj_id'] = None
+            ele._id_cache['doc_id'] = None
+
+
 class ChromiumPageScroll(ChromiumScroll):
     def __init__(self, page):
         """
@@ -1210,6 +1906,50 @@ class ChromiumPageScroll(ChromiumScroll):
         self._wait_scrolled()
 
 
+def _crop_screenshots(page, rects, pic_type, max_height=8000):
+    """按元素位置分段截取页面，每段只截取一次，再用Pillow在本地裁剪出各元素图片
+    :param page: ChromiumBase对象
+    :param rects: 元素(x, y, 宽, 高)组成的列表，为页面绝对坐标
+    :param pic_type: 图片格式，'jpeg'、'png'或'webp'
+    :param max_height: 每段截图的最大高度，避免超出浏览器纹理大小限制
+    :return: 各元素图片bytes组成的列表
+    """
+    try:
+        from PIL import Image
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError('请先安装Pillow，pip install Pillow')
+    from io import BytesIO
+
+    # 按纵坐标把元素分成若干段，每段截一次图
+    bands = []
+    for i in sorted(range(len(rects)), key=lambda n: rects[n][1]):
+        y, h = rects[i][1], rects[i][3]
+        if bands and max(bands[-1][2], y + h) - bands[-1][1] <= max_height:
+            bands[-1][0].append(i)
+            bands[-1][2] = max(bands[-1][2], y + h)
+        else:
+            bands.append([[i], y, y + h])
+
+    result = [None] * len(rects)
+    for indexes, top, bottom in bands:
+        left = min(rects[i][0] for i in indexes)
+        right = max(rects[i][0] + rects[i][2] for i in indexes)
+        clip = {'x': left, 'y': top, 'width': right - left, 'height': bottom - top, 'scale': 1}
+        data = page.run_cdp_loaded('Page.captureScreenshot', format='png', captureBeyondViewport=True, clip=clip)
+        img = Image.open(BytesIO(b64decode(data['data'])))
+        scale = img.width / clip['width'] if clip['width'] else 1  # 截图为设备像素，元素位置为css像素
+        for i in indexes:
+            x, y, w, h = rects[i]
+            x, y = int(round((x - left) * scale)), int(round((y - top) * scale))
+            pic = img.crop((x, y, x + int(round(w * scale)), y + int(round(h * scale))))
+            if pic_type == 'jpeg':
+                pic = pic.convert('RGB')
+            buffer = BytesIO()
+            pic.save(buffer, format=pic_type.upper())
+            result[i] = buffer.getvalue()
+    return result
+
+
 class Timeout(object):
     """用于保存d模式timeout信息的类"""
 
@@ -1308,6 +2048,7 @@ class Screencast(object):
             raise ValueError('save_path必须设置。')
         clean_folder(self._path)
         if self._mode.startswith('frugal'):
+            self._page.driver.dispatcher.set_lane('Page.screencastFrame', 'Screencast')  # 写文件较慢，不阻塞其它Page事件
             self._page.driver.Page.screencastFrame = self._onScreencastFrame
             self._page.run_cdp('Page.startScreencast', everyNthFrame=1, quality=100)
 
@@ -1366,6 +2107,7 @@ class Screencast(object):
 
         if self._mode.startswith('frugal'):
             self._page.driver.Page.screencastFrame = None
+            self._page.driver.dispatcher.set_lane('Page.screencastFrame', None)
             self._page.run_cdp('Page.stopScreencast')
         else:
             self._enable = False
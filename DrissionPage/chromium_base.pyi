@@ -3,15 +3,19 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-from typing import Union, Tuple, List, Any, Dict
+from itertools import count
+from threading import Event, Condition, Lock, local
+from typing import Union, Tuple, List, Any, Dict, Deque, Generator, Pattern, Set
+from weakref import WeakSet
 
 from DataRecorder import Recorder
 from requests import Session
 from requests.cookies import RequestsCookieJar
 
 from .base import BasePage
-from .chromium_driver import ChromiumDriver
+from .chromium_driver import ChromiumDriver, AsyncChromiumDriver
 from .chromium_element import ChromiumElement, ChromiumScroll
 from .chromium_frame import ChromiumFrame
 from .commons.constants import NoneElement
@@ -20,6 +24,11 @@ from .session_element import SessionElement
 
 
 class ChromiumBase(BasePage):
+    _load_tracker: LoadTracker
+    _interceptor: Union[Interceptor, None]
+    _nav_group: Union[str, None]
+    _doc_backend_id: Union[int, None]
+    _scopes: Union[local, None]
 
     def __init__(self,
                  address: Union[str, int],
@@ -28,10 +37,10 @@ class ChromiumBase(BasePage):
         self._control_session: Session = ...
         self.address: str = ...
         self._tab_obj: ChromiumDriver = ...
+        self._async_tab_obj: AsyncChromiumDriver = ...
         self._is_reading: bool = ...
         self._timeouts: Timeout = ...
         self._first_run: bool = ...
-        self._is_loading: bool = ...
         self._page_load_strategy: str = ...
         self._scroll: ChromiumScroll = ...
         self._url: str = ...
@@ -49,6 +58,8 @@ class ChromiumBase(BasePage):
 
     def _driver_init(self, tab_id: str) -> None: ...
 
+    def _get_flatten_driver(self) -> Union[ChromiumDriver, None]: ...
+
     def _get_document(self) -> None: ...
 
     def _wait_loaded(self, timeout: float = None) -> bool: ...
@@ -57,6 +68,8 @@ class ChromiumBase(BasePage):
 
     def _onFrameStoppedLoading(self, **kwargs): ...
 
+    def _onLifecycleEvent(self, **kwargs): ...
+
     def _onLoadEventFired(self, **kwargs): ...
 
     def _onDocumentUpdated(self, **kwargs): ...
@@ -78,9 +91,29 @@ class ChromiumBase(BasePage):
     @property
     def driver(self) -> ChromiumDriver: ...
 
+    @property
+    def async_driver(self) -> AsyncChromiumDriver: ...
+
     @property
     def is_loading(self) -> bool: ...
 
+    @property
+    def _is_loading(self) -> Union[bool, None]: ...
+
+    @_is_loading.setter
+    def _is_loading(self, on_off: Union[bool, None]) -> None: ...
+
+    @property
+    def _tracker(self) -> LoadTracker: ...
+
+    @property
+    def _scope_stack(self) -> List[ObjectGroup]: ...
+
+    @property
+    def _object_group(self) -> str: ...
+
+    def _track_ele(self, ele: ChromiumElement) -> None: ...
+
     @property
     def is_alive(self) -> bool: ...
 
@@ -126,6 +159,9 @@ class ChromiumBase(BasePage):
     @property
     def wait(self) -> ChromiumBaseWaiter: ...
 
+    @property
+    def listen(self) -> NetworkListener: ...
+
     @property
     def set(self) -> ChromiumBaseSetter: ...
 
@@ -138,6 +174,8 @@ class ChromiumBase(BasePage):
 
     def run_async_js(self, script: str, *args: Any, as_expr: bool = False) -> None: ...
 
+    async def async_run_js(self, script: str, *args: Any, as_expr: bool = False) -> Any: ...
+
     def get(self,
             url: str,
             show_errmsg: bool = False,
@@ -145,6 +183,8 @@ class ChromiumBase(BasePage):
             interval: float = None,
             timeout: float = None) -> Union[None, bool]: ...
 
+    async def async_get(self, url: str, show_errmsg: bool = False, timeout: float = None) -> bool: ...
+
     def get_cookies(self, as_dict: bool = False, all_domains: bool = False, all_info: bool = False) -> Union[
         list, dict]: ...
 
@@ -161,6 +201,9 @@ class ChromiumBase(BasePage):
 
     def s_eles(self, loc_or_str: Union[Tuple[str, str], str]) -> List[Union[SessionElement, str]]: ...
 
+    def extract(self, loc_or_str: Union[Tuple[str, str], str], fields: Union[str, list, tuple, dict] = 'text',
+                timeout: float = None) -> List[Union[dict, str, None]]: ...
+
     def _find_elements(self,
                        loc_or_ele: Union[Tuple[str, str], str, ChromiumElement, ChromiumFrame],
                        timeout: float = None, single: bool = True, relative: bool = False, raise_err: bool = None) \
@@ -182,8 +225,16 @@ class ChromiumBase(BasePage):
 
     def get_frames(self, loc: Union[str, tuple] = None, timeout: float = None) -> List[ChromiumFrame]: ...
 
+    def scope(self) -> ObjectGroup: ...
+
     def run_cdp(self, cmd: str, **cmd_args) -> dict: ...
 
+    def run_cdp_many(self, cmds: List[Union[str, Tuple[str, dict]]]) -> List[dict]: ...
+
+    async def async_run_cdp(self, cmd: str, **cmd_args) -> dict: ...
+
+    def _check_cdp_result(self, r: dict) -> dict: ...
+
     def run_cdp_loaded(self, cmd: str, **cmd_args) -> dict: ...
 
     def get_session_storage(self, item: str = None) -> Union[str, dict, None]: ...
@@ -196,6 +247,13 @@ class ChromiumBase(BasePage):
                        left_top: Tuple[int, int] = None,
                        right_bottom: Tuple[int, int] = None) -> Union[str, bytes]: ...
 
+    def get_screenshots(self,
+                        eles: List[Union[ChromiumElement, str, Tuple[str, str]]],
+                        path: Union[str, Path] = None,
+                        pic_type: str = 'png',
+                        as_bytes: bool = False,
+                        as_base64: bool = False) -> List[Union[str, bytes]]: ...
+
     def _get_screenshot(self, path: [str, Path] = None,
                         as_bytes: [bool, str] = None, as_base64: [bool, str] = None,
                         full_page: bool = False,
@@ -244,7 +302,31 @@ class ChromiumBaseWaiter(object):
     def upload_paths_inputted(self) -> None: ...
 
 
+class LoadTracker(object):
+    def __init__(self):
+        self._is_loading: Union[bool, None] = ...
+        self._started: Event = ...
+        self._stopped: Event = ...
+        self._changed: Event = ...
+
+    @property
+    def is_loading(self) -> Union[bool, None]: ...
+
+    def set_loading(self, on_off: Union[bool, None]) -> None: ...
+
+    def notify(self) -> None: ...
+
+    def clear_changed(self) -> None: ...
+
+    def wait_changed(self, timeout: float = .5) -> bool: ...
+
+    def wait_loading(self, start: bool = True, timeout: float = None) -> bool: ...
+
+
 class NetworkListener(object):
+    _body_pool: Union[ThreadPoolExecutor, None] = ...
+    _body_pool_lock: Lock = ...
+
     def __init__(self, page):
         self._page: ChromiumBase = ...
         self._targets: Union[str, dict] = ...
@@ -252,11 +334,32 @@ class NetworkListener(object):
         self._results: Union[ResponseData, Dict[str, ResponseData], False] = ...
         self._is_regex: bool = ...
         self._requests: dict = ...
+        self._cond: Condition = ...
+        self._buffer: Deque[ResponseData] = ...
+        self._counts: Dict[str, int] = ...
+        self._dropped: int = ...
+        self._body_mode: str = ...
+        self._max_body_size: Union[int, None] = ...
+        self._futures: Set[Future] = ...
 
-    def set_targets(self, targets: Union[str, list, tuple, set], is_regex: bool = False) -> None: ...
+    @property
+    def counts(self) -> Dict[str, int]: ...
+
+    @property
+    def dropped(self) -> int: ...
+
+    @property
+    def pending(self) -> int: ...
+
+    def set_targets(self, targets: Union[str, list, tuple, set], is_regex: bool = False,
+                    buffer_size: int = None) -> None: ...
+
+    def set_body_mode(self, mode: str = 'async', max_size: int = None) -> None: ...
 
     def stop(self) -> None: ...
 
+    def steps(self, count: int = None, timeout: float = None) -> Generator[ResponseData, None, None]: ...
+
     def listen(self, timeout: float = None,
                any_one: bool = False) -> Union[ResponseData, Dict[str, ResponseData], False]: ...
 
@@ -264,9 +367,82 @@ class NetworkListener(object):
 
     def _loading_finished(self, **kwargs) -> None: ...
 
+    def _get_body(self, request_id: str) -> Tuple[Union[str, None], bool]: ...
+
+    @staticmethod
+    def _wait_body(future: Future) -> Tuple[Union[str, None], bool]: ...
+
+    @classmethod
+    def _get_body_pool(cls) -> ThreadPoolExecutor: ...
+
+    def _loading_failed(self, **kwargs) -> None: ...
+
     def _requestWillBeSent(self, **kwargs) -> None: ...
 
 
+class Interceptor(object):
+    RESOURCE_TYPES: Tuple[str, ...] = ...
+
+    def __init__(self, page: ChromiumBase):
+        self._page: ChromiumBase = ...
+        self._rules: List[dict] = ...
+        self._compiled: Dict[Union[str, None], Union[Pattern, None]] = ...
+        self._types: Dict[str, str] = ...
+
+    @property
+    def rules(self) -> List[dict]: ...
+
+    def block(self, *patterns: str, resource_types: Union[str, list, tuple, set] = None) -> Interceptor: ...
+
+    def block_types(self, *resource_types: str) -> Interceptor: ...
+
+    def mock(self,
+             pattern: str,
+             path: Union[str, Path] = None,
+             body: Union[str, bytes] = None,
+             status: int = 200,
+             headers: dict = None,
+             resource_types: Union[str, list, tuple, set] = None) -> Interceptor: ...
+
+    def headers(self, pattern: str, headers: dict,
+                resource_types: Union[str, list, tuple, set] = None) -> Interceptor: ...
+
+    def remove(self, pattern: str) -> Interceptor: ...
+
+    def clear(self) -> None: ...
+
+    def match(self, url: str, resource_type: str = None) -> Union[dict, None]: ...
+
+    def _add_rule(self, pattern: str, resource_types: Union[str, list, tuple, set, None], action: str,
+                  **kwargs) -> None: ...
+
+    def _compile(self, resource_type: Union[str, None]) -> Union[Pattern, None]: ...
+
+    def _apply(self) -> None: ...
+
+    def _on_request_paused(self, **kwargs) -> None: ...
+
+
+class ObjectGroup(object):
+    _ids: count = ...
+
+    def __init__(self, page: ChromiumBase):
+        self._page: ChromiumBase = ...
+        self.name: str = ...
+        self._eles: WeakSet[ChromiumElement] = ...
+
+    def __enter__(self) -> ObjectGroup: ...
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None: ...
+
+    @classmethod
+    def new_name(cls) -> str: ...
+
+    def add_ele(self, ele: ChromiumElement) -> None: ...
+
+    def release(self) -> None: ...
+
+
 class ChromiumPageScroll(ChromiumScroll):
     def __init__(self, page: ChromiumBase): ...
 
@@ -285,6 +461,11 @@ class ChromiumBaseSetter(object):
     @property
     def scroll(self) -> PageScrollSetter: ...
 
+    @property
+    def intercept(self) -> Interceptor: ...
+
+    def event_dispatch(self, max_size: int = None, policy: str = None, by_domain: bool = None) -> None: ...
+
     def retry_times(self, times: int) -> None: ...
 
     def retry_interval(self, interval: float) -> None: ...
@@ -304,6 +485,12 @@ class ChromiumBaseSetter(object):
     def upload_files(self, files: Union[str, list, tuple]) -> None: ...
 
 
+def _crop_screenshots(page: ChromiumBase,
+                      rects: List[Tuple[float, float, float, float]],
+                      pic_type: str,
+                      max_height: int = 8000) -> List[bytes]: ...
+
+
 class Timeout(object):
 
     def __init__(self, page: ChromiumBase, implicit=None, page_load=None, script=None):
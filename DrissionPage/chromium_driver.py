@@ -3,10 +3,19 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
+from asyncio import get_event_loop, wait_for, ensure_future, iscoroutinefunction, CancelledError, \
+    TimeoutError as AsyncTimeoutError, run_coroutine_threadsafe
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-from json import dumps, loads
-from queue import Queue, Empty
-from threading import Thread, Event
+from importlib import import_module
+from itertools import count
+from os import read, write, close
+from select import select
+from threading import Thread, Event, Lock
+from time import perf_counter
+from traceback import print_exc
+from warnings import warn
 
 from websocket import WebSocketTimeoutException, WebSocketException, WebSocketConnectionClosedException, \
     create_connection
@@ -32,31 +41,333 @@ class GenericAttr(object):
         self.tab.set_listener(f"{self.name}.{key}", value)
 
 
+_ALERT_RESULT = {'error': {'message': 'alert exists'}, 'type': 'alert_exists'}
+_NO_RESULT = object()
+# 没有绑定回调方法也要处理的事件
+_INNER_EVENTS = frozenset(('Page.javascriptDialogOpening', 'Page.javascriptDialogClosed', 'Target.detachedFromTarget'))
+_EVENT_HEAD = '{"method":"'
+# 必须得到回应的事件，丢弃会使请求或弹窗一直处于暂停状态，通道已满也不丢弃
+_NO_DROP_EVENTS = frozenset(('Page.javascriptDialogOpening', 'Page.javascriptDialogClosed', 'Page.fileChooserOpened'))
+
+_loads = None
+_dumps = None
+
+
+def set_json_codec(codec=None):
+    """设置driver收发信息使用的json库
+    :param codec: 'orjson'、'ujson'、'json'，或有loads()和dumps()方法的对象，为None时自动选择已安装的最快的库
+    :return: 使用的库名称
+    """
+    global _loads, _dumps
+    if codec is None:
+        for name in ('orjson', 'ujson', 'json'):
+            try:
+                _loads, _dumps = _load_codec(name)
+                return name
+            except ModuleNotFoundError:
+                continue
+
+    if isinstance(codec, str):
+        try:
+            _loads, _dumps = _load_codec(codec)
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError(f'请先安装{codec}，pip install {codec}')
+        return codec
+
+    _loads, _dumps = codec.loads, codec.dumps
+    return getattr(codec, '__name__', str(codec))
+
+
+def _load_codec(name):
+    """导入json库，返回其loads()和dumps()方法
+    :param name: 库名称
+    :return: (loads, dumps)
+    """
+    module = import_module(name)
+    if name == 'orjson':  # orjson.dumps()返回bytes
+        orjson_dumps = module.dumps
+        return module.loads, lambda obj: orjson_dumps(obj).decode()
+    return module.loads, module.dumps
+
+
+set_json_codec()
+
+
+class _Reply(object):
+    """等待一条信息返回结果的对象，由接收线程直接填入结果并唤醒等待的线程"""
+    __slots__ = ('driver', 'result', '_lock', '_sets')
+
+    def __init__(self, driver):
+        """
+        :param driver: 发送该信息的ChromiumDriver对象
+        """
+        self.driver = driver
+        self.result = _NO_RESULT
+        self._lock = Lock()
+        self._lock.acquire()
+        self._sets = count()  # next()是原子操作，多个线程同时填入时只有第一个得到0，不需要额外的锁
+
+    def set(self, result):
+        """填入结果，只有第一次有效
+        :param result: 浏览器返回的数据，None表示连接已断开
+        :return: None
+        """
+        if next(self._sets):
+            return
+        self.result = result
+        self._lock.release()
+
+    def wait(self, timeout=None):
+        """等待结果
+        :param timeout: 超时时间，为None时一直等待
+        :return: 是否已有结果
+        """
+        return self._lock.acquire(timeout=-1 if timeout is None else max(timeout, 0))
+
+
+class PipeConnection(object):
+    """通过--remote-debugging-pipe继承的文件描述符与浏览器通信的连接，接口与websocket连接相同，每条信息以\\0结尾"""
+
+    def __init__(self, read_fd, write_fd):
+        """
+        :param read_fd: 读取浏览器信息的文件描述符，对应浏览器的fd 4
+        :param write_fd: 向浏览器发送信息的文件描述符，对应浏览器的fd 3
+        """
+        self._read_fd = read_fd
+        self._write_fd = write_fd
+        self._timeout = None
+        self._buffer = bytearray()
+        self._send_lock = Lock()
+        self.connected = True
+
+    def settimeout(self, timeout):
+        """设置recv()的超时时间
+        :param timeout: 超时时间（秒），为None时一直等待
+        :return: None
+        """
+        self._timeout = timeout
+
+    def send(self, message):
+        """发送一条信息，多线程同时调用时不会交错
+        :param message: json文本
+        :return: None
+        """
+        if not self.connected:
+            raise WebSocketConnectionClosedException('连接已关闭。')
+        data = memoryview(message.encode('utf-8') + b'\0')
+        with self._send_lock:
+            while data:
+                data = data[write(self._write_fd, data):]
+
+    def recv(self):
+        """接收一条信息，超时抛出WebSocketTimeoutException
+        :return: json文本
+        """
+        while True:
+            end = self._buffer.find(b'\0')
+            if end >= 0:
+                message = self._buffer[:end].decode('utf-8')
+                del self._buffer[:end + 1]
+                return message
+
+            if not self.connected:
+                raise WebSocketConnectionClosedException('连接已关闭。')
+            if not select([self._read_fd], [], [], self._timeout)[0]:
+                raise WebSocketTimeoutException('接收超时。')
+            data = read(self._read_fd, 1048576)
+            if not data:
+                self.close()
+                raise WebSocketConnectionClosedException('浏览器已关闭管道。')
+            self._buffer.extend(data)
+
+    def close(self):
+        """关闭两个文件描述符"""
+        if self.connected:
+            self.connected = False
+            for fd in (self._write_fd, self._read_fd):
+                try:
+                    close(fd)
+                except OSError:
+                    pass
+
+
+class EventDispatcher(object):
+    """把事件分成多条通道，同一通道内按顺序执行回调方法，不同通道在共用的线程池中并行执行"""
+    max_workers = 32  # 所有driver共用的线程池大小
+    _pool = None
+    _pool_lock = Lock()
+
+    def __init__(self, driver, max_size=10000, policy='drop', by_domain=True):
+        """
+        :param driver: ChromiumDriver对象
+        :param max_size: 每条通道最多积压的事件数，为0时不限制
+        :param policy: 通道已满时的处理方式，'drop'丢弃新事件，'warn'仍放入并发出警告
+        :param by_domain: 是否按域分通道，为False时所有事件在一条通道中按顺序执行
+        """
+        self._driver = driver
+        self._lanes = {}  # 通道名称: 事件队列
+        self._lane_of = {}  # 事件名称: 指定的通道名称
+        self._running = set()  # 已在线程池中运行的通道
+        self._warned = set()  # 已发出积压警告的通道
+        self._lock = Lock()
+        self._size = 0
+        self._dropped = {}
+        self.peak = 0
+        self.dispatched = 0
+        self.set(max_size, policy, by_domain)
+
+    @property
+    def size(self):
+        """返回所有通道中等待执行的事件总数"""
+        return self._size
+
+    @property
+    def depths(self):
+        """返回每条通道中等待执行的事件数"""
+        with self._lock:
+            return {k: len(v) for k, v in self._lanes.items() if v}
+
+    @property
+    def dropped(self):
+        """返回每条通道因积压过多而丢弃的事件数"""
+        return dict(self._dropped)
+
+    def set(self, max_size=None, policy=None, by_domain=None):
+        """修改设置，参数为None时不修改
+        :param max_size: 每条通道最多积压的事件数，为0时不限制
+        :param policy: 通道已满时的处理方式，'drop'或'warn'
+        :param by_domain: 是否按域分通道
+        :return: None
+        """
+        if policy is not None:
+            if policy not in ('drop', 'warn'):
+                raise ValueError("policy参数只能是'drop'或'warn'。")
+            self.policy = policy
+        if max_size is not None:
+            self.max_size = max_size
+        if by_domain is not None:
+            self.by_domain = by_domain
+
+    def set_lane(self, method, lane):
+        """让某个事件在指定的通道中执行，用于把耗时的回调方法与其它事件分开
+        :param method: 事件名称
+        :param lane: 通道名称，为None时恢复默认
+        :return: None
+        """
+        if lane is None:
+            self._lane_of.pop(method, None)
+        else:
+            self._lane_of[method] = lane
+
+    def put(self, event):
+        """把事件放入对应的通道，由接收线程调用，不会阻塞
+        :param event: 浏览器发来的事件数据
+        :return: 是否已放入
+        """
+        method = event['method']
+        lane = self._lane_of.get(method) or (method.split('.', 1)[0] if self.by_domain else '')
+        with self._lock:
+            if self._driver._stopped.is_set():
+                return False
+            queue = self._lanes.get(lane)
+            if queue is None:
+                queue = self._lanes[lane] = deque()
+
+            if self.max_size and len(queue) >= self.max_size:
+                if self.policy == 'drop' and method not in _NO_DROP_EVENTS and not method.startswith('Fetch.'):
+                    self._dropped[lane] = self._dropped.get(lane, 0) + 1
+                    return False
+                if lane not in self._warned:
+                    self._warned.add(lane)
+                    warn(f'{self._driver}的{lane}通道积压事件超过{self.max_size}个，回调方法处理过慢。', RuntimeWarning)
+
+            queue.append(event)
+            self._size += 1
+            if self._size > self.peak:
+                self.peak = self._size
+            if lane in self._running:
+                return True
+            self._running.add(lane)
+
+        try:
+            self._get_pool().submit(self._run_lane, lane)
+        except RuntimeError:  # 解释器正在退出
+            self._running.discard(lane)
+            return False
+        return True
+
+    def clear(self):
+        """清空所有通道"""
+        with self._lock:
+            for queue in self._lanes.values():
+                queue.clear()
+            self._size = 0
+            self._warned.clear()
+
+    def close(self):
+        """driver停止时清空所有通道，共用的线程池不关闭，正在执行的通道执行完当前事件后退出"""
+        self.clear()
+
+    def _run_lane(self, lane):
+        """在线程池中按顺序执行一条通道中的事件，通道为空时退出
+        :param lane: 通道名称
+        :return: None
+        """
+        queue = self._lanes[lane]
+        while True:
+            with self._lock:
+                if not queue or self._driver._stopped.is_set():
+                    self._running.discard(lane)
+                    return
+                event = queue.popleft()
+                self._size -= 1
+                self.dispatched += 1
+                if not queue:
+                    self._warned.discard(lane)
+
+            handler = self._driver.event_handlers.get(event['method'])
+            if handler:
+                try:
+                    handler(**event['params'])
+                except Exception:
+                    print_exc()
+
+    @classmethod
+    def _get_pool(cls):
+        """返回所有driver共用的线程池"""
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = ThreadPoolExecutor(cls.max_workers, thread_name_prefix='DrissionPageEvent')
+        return cls._pool
+
+
 class ChromiumDriver(object):
     _INITIAL_ = 'initial'
     _STARTED_ = 'started'
     _STOPPED_ = 'stopped'
 
-    def __init__(self, tab_id, tab_type, address):
+    def __init__(self, tab_id, tab_type, address, pipe=None):
         """
         :param tab_id: 标签页id
         :param tab_type: 标签页类型
         :param address: 浏览器连接地址
+        :param pipe: 以管道方式启动的浏览器的PipeConnection对象，传入时不使用websocket，只能用于浏览器级别的driver
         """
         self.id = tab_id
         self.address = address
         self.type = tab_type
         self.debug = False
         self.has_alert = False
+        self.lazy_decode = True  # 是否不解析没有回调方法的事件
 
         self._websocket_url = f'ws://{address}/devtools/{tab_type}/{tab_id}'
-        self._cur_id = 0
+        self._pipe = pipe
+        self._ids = count(1)
         self._ws = None
 
         self._recv_th = Thread(target=self._recv_loop)
-        self._handle_event_th = Thread(target=self._handle_event_loop)
         self._recv_th.daemon = True
-        self._handle_event_th.daemon = True
 
         self._stopped = Event()
         self._started = False
@@ -64,7 +375,8 @@ class ChromiumDriver(object):
 
         self.event_handlers = {}
         self.method_results = {}
-        self.event_queue = Queue()
+        self.dispatcher = EventDispatcher(self)
+        self._sessions = {}
 
     def _send(self, message, timeout=None):
         """发送信息到浏览器，并返回浏览器返回的信息
@@ -72,44 +384,78 @@ class ChromiumDriver(object):
         :param timeout: 超时时间
         :return: 浏览器返回的数据
         """
-        if 'id' not in message:
-            self._cur_id += 1
-            message['id'] = self._cur_id
-
-        message_json = dumps(message)
+        return self._send_many([message], timeout)[0]
 
-        if self.debug:
-            print(f"发> {message_json}")
-
-        if not isinstance(timeout, (int, float)) or timeout > 1:
-            q_timeout = 1
-        else:
-            q_timeout = timeout / 2.0
+    def _next_id(self):
+        """返回一个新的信息id，多线程同时调用也不会重复"""
+        return next(self._ids)
 
+    def _send_many(self, messages, timeout=None):
+        """一次发送多条信息到浏览器，再按id收集返回的信息
+        :param messages: 发送给浏览器的数据组成的列表
+        :param timeout: 超时时间
+        :return: 浏览器返回的数据组成的列表，顺序与发送时一致
+        """
+        replies = []
+        for message in messages:
+            if 'id' not in message:
+                message['id'] = self._next_id()
+            reply = _Reply(self)
+            self.method_results[message['id']] = reply
+            replies.append(reply)
+
+        end_time = perf_counter() + timeout if isinstance(timeout, (int, float)) else None
         try:
-            self.method_results[message['id']] = Queue()
-            self._ws.send(message_json)
-
-            while not self._stopped.is_set():
-                try:
-                    if isinstance(timeout, (int, float)):
-                        if timeout < q_timeout:
-                            q_timeout = timeout
-                        timeout -= q_timeout
+            if self._stopped.is_set():
+                return [None for _ in messages]
 
-                    return self.method_results[message['id']].get(timeout=q_timeout)
+            for message in messages:
+                message_json = _dumps(message)
+                if self.debug:
+                    print(f"发> {message_json}")
+                self._ws.send(message_json)
 
-                except Empty:
-                    if self.has_alert:
-                        return {'error': {'message': 'alert exists'}, 'type': 'alert_exists'}
-
-                    if isinstance(timeout, (int, float)) and timeout <= 0:
-                        raise TimeoutError(f"调用{message['method']}超时。")
-
-                    continue
+            return [self._get_result(message, reply, end_time) for message, reply in zip(messages, replies)]
 
         finally:
-            self.method_results.pop(message['id'], None)
+            for message in messages:
+                self.method_results.pop(message['id'], None)
+
+    def _get_result(self, message, reply, end_time=None):
+        """等待并返回某条信息的执行结果
+        :param message: 已发送的数据
+        :param reply: 该信息的_Reply对象
+        :param end_time: 超时的时间点，为None时不限时
+        :return: 浏览器返回的数据，连接断开时返回None
+        """
+        while True:
+            timeout = None if end_time is None else end_time - perf_counter()
+            if self.has_alert:  # 弹窗出现后发出的调用可能被阻塞，每秒检查一次
+                timeout = 1 if timeout is None else min(timeout, 1)
+
+            if reply.wait(timeout):
+                return reply.result
+            if self.has_alert:
+                return _ALERT_RESULT
+            if end_time is not None and perf_counter() >= end_time:
+                raise TimeoutError(f"调用{message['method']}超时。")
+
+    def _on_dialog(self, opened):
+        """弹窗出现或关闭时由接收线程调用，出现时立即让等待中的调用返回
+        :param opened: 是否出现
+        :return: None
+        """
+        self.has_alert = opened
+        if opened:
+            for reply in list(self.method_results.values()):
+                if reply.driver is self:
+                    reply.set(_ALERT_RESULT)
+
+    def _release_replies(self):
+        """连接断开时让本对象所有等待中的调用返回"""
+        for reply in list(self.method_results.values()):
+            if reply.driver is self:
+                reply.set(None)
 
     def _recv_loop(self):
         """接收浏览器信息的守护线程方法"""
@@ -117,42 +463,58 @@ class ChromiumDriver(object):
             try:
                 self._ws.settimeout(1)
                 message_json = self._ws.recv()
-                message = loads(message_json)
             except WebSocketTimeoutException:
                 continue
             except (WebSocketException, OSError, WebSocketConnectionClosedException):
                 self.stop()
                 return
 
+            # 浏览器发来的事件以method开头，没有对象需要的事件不解析直接丢弃
+            if self.lazy_decode and not self.debug and message_json.startswith(_EVENT_HEAD):
+                method = message_json[len(_EVENT_HEAD):message_json.find('"', len(_EVENT_HEAD))]
+                if not self._is_wanted(method):
+                    continue
+
+            message = _loads(message_json)
             if self.debug:
                 print(f'<收 {message_json}')
 
             if "method" in message:
-                self.event_queue.put(message)
+                method = message['method']
+                if method in ('Page.javascriptDialogOpening', 'Page.javascriptDialogClosed'):
+                    driver = self._sessions.get(message['sessionId']) if 'sessionId' in message else self
+                    if driver:
+                        driver._on_dialog(method == 'Page.javascriptDialogOpening')
+
+                if 'sessionId' in message:  # flatten模式下分发给对应的session
+                    session = self._sessions.get(message['sessionId'])
+                    if session and method in session.event_handlers:
+                        session.dispatcher.put(message)
+                    continue
+
+                if method == 'Target.detachedFromTarget':
+                    session = self._sessions.pop(message['params']['sessionId'], None)
+                    if session:
+                        session._on_detached()
+                if method in self.event_handlers:
+                    self.dispatcher.put(message)
 
             elif "id" in message:
-                if message["id"] in self.method_results:
-                    self.method_results[message['id']].put(message)
+                reply = self.method_results.get(message['id'])
+                if reply:
+                    reply.set(message)
 
             elif self.debug:
                 print(f'未知信息：{message}')
 
-    def _handle_event_loop(self):
-        """当接收到浏览器信息，执行已绑定的方法"""
-        while not self._stopped.is_set():
-            try:
-                event = self.event_queue.get(timeout=1)
-            except Empty:
-                continue
-
-            if event['method'] in self.event_handlers:
-                try:
-                    self.event_handlers[event['method']](**event['params'])
-                except Exception as e:
-                    raise
-                    # raise RuntimeError(f"\n回调函数错误：\n{e}")
-
-            self.event_queue.task_done()
+    def _is_wanted(self, method):
+        """判断是否有对象需要处理某个事件
+        :param method: 事件名称
+        :return: bool
+        """
+        if method in self.event_handlers or method in _INNER_EVENTS:
+            return True
+        return any(method in session.event_handlers for session in list(self._sessions.values()))
 
     def __getattr__(self, item):
         attr = GenericAttr(item, self)
@@ -177,13 +539,39 @@ class ChromiumDriver(object):
 
         timeout = kwargs.pop("_timeout", None)
         result = self._send({"method": _method, "params": kwargs}, timeout=timeout)
+        return self._parse_result(result, _method, kwargs)
+
+    def call_methods(self, cmds, timeout=None):
+        """一次发送多个cdp方法，不等待前一个返回就发送下一个
+        :param cmds: 由(cdp方法名, 参数dict)组成的列表，无参数时可只传方法名
+        :param timeout: 超时时间
+        :return: 执行结果组成的列表，顺序与cmds一致
+        """
+        if not self._started:
+            self.start()
+
+        cmds = [(i, {}) if isinstance(i, str) else (i[0], dict(i[1] or {})) for i in cmds]
+        if self._stopped.is_set():
+            return [{'error': 'tab closed', 'type': 'tab_closed'} for _ in cmds]
+
+        results = self._send_many([{"method": method, "params": params} for method, params in cmds], timeout)
+        return [self._parse_result(result, method, params) for result, (method, params) in zip(results, cmds)]
+
+    @staticmethod
+    def _parse_result(result, method, params):
+        """把浏览器返回的数据转换为执行结果
+        :param result: 浏览器返回的数据
+        :param method: cdp方法名
+        :param params: cdp参数
+        :return: 执行结果
+        """
         if result is None:
             return {'error': 'tab closed', 'type': 'tab_closed'}
         if 'result' not in result and 'error' in result:
             return {'error': result['error']['message'],
                     'type': result.get('type', 'call_method_error'),
-                    'method': _method,
-                    'args': kwargs}
+                    'method': method,
+                    'args': params}
 
         return result['result']
 
@@ -197,9 +585,8 @@ class ChromiumDriver(object):
         self._started = True
         self.status = self._STARTED_
         self._stopped.clear()
-        self._ws = create_connection(self._websocket_url, enable_multithread=True)
+        self._ws = self._pipe or create_connection(self._websocket_url, enable_multithread=True)
         self._recv_th.start()
-        self._handle_event_th.start()
         return True
 
     def stop(self):
@@ -211,12 +598,17 @@ class ChromiumDriver(object):
 
         self.status = self._STOPPED_
         self._stopped.set()
+        for session in list(self._sessions.values()):
+            session._on_detached()
+        self._sessions.clear()
         if self._ws:
             self._ws.close()
             self._ws = None
         self.event_handlers.clear()
+        for reply in list(self.method_results.values()):
+            reply.set(None)
         self.method_results.clear()
-        self.event_queue.queue.clear()
+        self.dispatcher.close()
         return True
 
     def set_listener(self, event, callback):
@@ -244,3 +636,302 @@ class ChromiumDriver(object):
         return f"<ChromiumDriver {self.id}>"
 
     __repr__ = __str__
+
+
+class ChromiumSessionDriver(ChromiumDriver):
+    """以flatten方式附着到target的driver，与浏览器driver共用一个websocket连接，以sessionId区分"""
+
+    def __init__(self, tab_id, tab_type, browser_driver):
+        """
+        :param tab_id: 标签页id
+        :param tab_type: 标签页类型
+        :param browser_driver: 浏览器级别的ChromiumDriver对象
+        """
+        super().__init__(tab_id, tab_type, browser_driver.address)
+        self.session_id = None
+        self._browser = browser_driver
+
+    def _send_many(self, messages, timeout=None):
+        """一次发送多条信息到浏览器，再按id收集返回的信息
+        :param messages: 发送给浏览器的数据组成的列表
+        :param timeout: 超时时间
+        :return: 浏览器返回的数据组成的列表，顺序与发送时一致
+        """
+        for message in messages:
+            if 'id' not in message:
+                message['id'] = self._browser._next_id()
+            message['sessionId'] = self.session_id
+        return super()._send_many(messages, timeout)
+
+    def start(self):
+        """附着到target"""
+        if self._started:
+            return False
+
+        self._browser.start()
+        r = self._browser.call_method('Target.attachToTarget', targetId=self.id, flatten=True)
+        if 'sessionId' not in r:
+            raise RuntimeError(f'连接{self.id}失败：{r.get("error")}')
+
+        self.session_id = r['sessionId']
+        self._ws = self._browser._ws
+        self.method_results = self._browser.method_results
+        self._started = True
+        self.status = self._STARTED_
+        self._stopped.clear()
+        self._browser._sessions[self.session_id] = self
+        return True
+
+    def stop(self):
+        """从target分离，不关闭共用的连接"""
+        if self._stopped.is_set():
+            return False
+        if not self._started:
+            return True
+
+        self._browser._sessions.pop(self.session_id, None)
+        self._on_detached()
+        if not self._browser._stopped.is_set():
+            self._browser.call_method('Target.detachFromTarget', sessionId=self.session_id)
+        return True
+
+    def _on_detached(self):
+        """target已分离时调用"""
+        self.status = self._STOPPED_
+        self._stopped.set()
+        self._ws = None
+        self._release_replies()
+        self.event_handlers.clear()
+        self.dispatcher.close()
+
+    def __str__(self):
+        return f"<ChromiumSessionDriver {self.id}>"
+
+    __repr__ = __str__
+
+
+class AsyncChromiumDriver(object):
+    """基于asyncio的浏览器连接对象，不创建线程，同一事件循环中可同时控制多个标签页"""
+    _INITIAL_ = 'initial'
+    _STARTED_ = 'started'
+    _STOPPED_ = 'stopped'
+
+    def __init__(self, tab_id, tab_type, address):
+        """
+        :param tab_id: 标签页id
+        :param tab_type: 标签页类型
+        :param address: 浏览器连接地址
+        """
+        self.id = tab_id
+        self.address = address
+        self.type = tab_type
+        self.debug = False
+        self.has_alert = False
+
+        self._websocket_url = f'ws://{address}/devtools/{tab_type}/{tab_id}'
+        self._cur_id = 0
+        self._ws = None
+        self._loop = None
+        self._recv_task = None
+
+        self._stopped = False
+        self._started = False
+        self.status = self._INITIAL_
+
+        self.event_handlers = {}
+        self.method_results = {}
+
+    async def _send(self, message, timeout=None):
+        """发送信息到浏览器，并返回浏览器返回的信息
+        :param message: 发送给浏览器的数据
+        :param timeout: 超时时间
+        :return: 浏览器返回的数据
+        """
+        if 'id' not in message:
+            self._cur_id += 1
+            message['id'] = self._cur_id
+
+        message_json = _dumps(message)
+
+        if self.debug:
+            print(f"发> {message_json}")
+
+        future = self._loop.create_future()
+        self.method_results[message['id']] = future
+        try:
+            await self._ws.send(message_json)
+            return await wait_for(future, timeout)
+        except AsyncTimeoutError:
+            raise TimeoutError(f"调用{message['method']}超时。")
+        finally:
+            self.method_results.pop(message['id'], None)
+
+    async def _recv_loop(self):
+        """接收浏览器信息的协程"""
+        while not self._stopped:
+            try:
+                message_json = await self._ws.recv()
+                message = _loads(message_json)
+            except CancelledError:
+                return
+            except Exception:
+                self._close()
+                return
+
+            if self.debug:
+                print(f'<收 {message_json}')
+
+            if "method" in message:
+                self._handle_event(message)
+
+            elif "id" in message:
+                future = self.method_results.get(message['id'])
+                if future and not future.done():
+                    future.set_result(message)
+
+            elif self.debug:
+                print(f'未知信息：{message}')
+
+    def _handle_event(self, event):
+        """执行事件绑定的方法，协程函数以任务形式运行，普通函数在事件循环中调用
+        :param event: 浏览器发来的事件数据
+        :return: None
+        """
+        method = event['method']
+        if method == 'Page.javascriptDialogOpening':
+            self.has_alert = True
+            for future in self.method_results.values():
+                if not future.done():
+                    future.set_result({'error': {'message': 'alert exists'}, 'type': 'alert_exists'})
+        elif method == 'Page.javascriptDialogClosed':
+            self.has_alert = False
+
+        handler = self.event_handlers.get(method)
+        if handler:
+            if iscoroutinefunction(handler):
+                ensure_future(handler(**event['params']))
+            else:
+                self._loop.call_soon(partial(handler, **event['params']))
+
+    def __getattr__(self, item):
+        attr = GenericAttr(item, self)
+        setattr(self, item, attr)
+        return attr
+
+    async def call_method(self, _method, *args, **kwargs):
+        """执行cdp方法
+        :param _method: cdp方法名
+        :param args: cdp参数
+        :param kwargs: cdp参数
+        :return: 执行结果
+        """
+        if not self._started:
+            await self.start()
+        if args:
+            raise CallMethodError("参数必须是key=value形式。")
+
+        if self._stopped:
+            return {'error': 'tab closed', 'type': 'tab_closed'}
+
+        timeout = kwargs.pop("_timeout", None)
+        result = await self._send({"method": _method, "params": kwargs}, timeout=timeout)
+        if result is None:
+            return {'error': 'tab closed', 'type': 'tab_closed'}
+        if 'result' not in result and 'error' in result:
+            return {'error': result['error']['message'],
+                    'type': result.get('type', 'call_method_error'),
+                    'method': _method,
+                    'args': kwargs}
+
+        return result['result']
+
+    async def start(self):
+        """启动连接"""
+        if self._started:
+            return False
+
+        try:
+            from websockets import connect
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError('请先安装websockets，pip install DrissionPage[async]')
+
+        self._loop = get_event_loop()
+        self._started = True
+        self.status = self._STARTED_
+        self._stopped = False
+        self._ws = await connect(self._websocket_url, max_size=None)
+        self._recv_task = ensure_future(self._recv_loop())
+        return True
+
+    async def stop(self):
+        """中断连接"""
+        if self._stopped:
+            return False
+        if not self._started:
+            return True
+
+        ws = self._ws
+        self._close()
+        if self._recv_task:
+            self._recv_task.cancel()
+            self._recv_task = None
+        if ws:
+            await ws.close()
+        return True
+
+    def stop_soon(self):
+        """在同步代码中中断连接，所属事件循环正在运行时以任务形式在其中关闭，
+        否则（已结束或已关闭）直接断开底层连接，不在其它事件循环中运行
+        :return: None
+        """
+        if self._loop is None or self._stopped:
+            return
+        if self._loop.is_running():
+            run_coroutine_threadsafe(self.stop(), self._loop)
+            return
+
+        transport = getattr(self._ws, 'transport', None)
+        self._close()
+        self._recv_task = None
+        if transport is not None:
+            try:
+                transport.abort()
+            except Exception:
+                pass
+
+    def _close(self):
+        """标记连接已断开，并使等待中的调用返回"""
+        self.status = self._STOPPED_
+        self._stopped = True
+        self._ws = None
+        for future in self.method_results.values():
+            if not future.done():
+                future.set_result(None)
+        self.event_handlers.clear()
+        self.method_results.clear()
+
+    def set_listener(self, event, callback):
+        """绑定cdp event和回调方法，回调方法可以是协程函数
+        :param event: cdp event
+        :param callback: 绑定到cdp event的回调方法
+        :return: 回调方法
+        """
+        if not callback:
+            return self.event_handlers.pop(event, None)
+        if not callable(callback):
+            raise RuntimeError("方法不能调用。")
+
+        self.event_handlers[event] = callback
+        return True
+
+    def get_listener(self, event):
+        """获取cdp event对应的回调方法
+        :param event: cdp event
+        :return: 回调方法
+        """
+        return self.event_handlers.get(event, None)
+
+    def __str__(self):
+        return f"<AsyncChromiumDriver {self.id}>"
+
+    __repr__ = __str__
@@ -3,19 +3,113 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
-from queue import Queue
-from threading import Thread, Event
-from typing import Union, Callable
+from asyncio import AbstractEventLoop, Future, Task
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from threading import Thread, Event, Lock
+from typing import Union, Callable, Dict, List, Tuple, Any, FrozenSet
 
 
 class GenericAttr(object):
-    def __init__(self, name: str, tab: ChromiumDriver): ...
+    def __init__(self, name: str, tab: Union[ChromiumDriver, AsyncChromiumDriver]): ...
 
     def __getattr__(self, item: str) -> Callable: ...
 
     def __setattr__(self, key: str, value: Callable) -> None: ...
 
 
+_ALERT_RESULT: dict = ...
+_NO_RESULT: object = ...
+_INNER_EVENTS: FrozenSet[str] = ...
+_EVENT_HEAD: str = ...
+_NO_DROP_EVENTS: FrozenSet[str] = ...
+
+_loads: Callable[[Union[str, bytes]], Any] = ...
+_dumps: Callable[[Any], str] = ...
+
+
+def set_json_codec(codec: Union[str, Any] = None) -> str: ...
+
+
+def _load_codec(name: str) -> Tuple[Callable[[Union[str, bytes]], Any], Callable[[Any], str]]: ...
+
+
+class _Reply(object):
+    def __init__(self, driver: ChromiumDriver):
+        self.driver: ChromiumDriver = ...
+        self.result: Union[dict, None, object] = ...
+        self._lock: Lock = ...
+        self._sets: count = ...
+
+    def set(self, result: Union[dict, None]) -> None: ...
+
+    def wait(self, timeout: float = None) -> bool: ...
+
+
+class PipeConnection(object):
+    def __init__(self, read_fd: int, write_fd: int):
+        self._read_fd: int = ...
+        self._write_fd: int = ...
+        self._timeout: Union[float, None] = ...
+        self._buffer: bytearray = ...
+        self._send_lock: Lock = ...
+        self.connected: bool = ...
+
+    def settimeout(self, timeout: Union[float, None]) -> None: ...
+
+    def send(self, message: str) -> None: ...
+
+    def recv(self) -> str: ...
+
+    def close(self) -> None: ...
+
+
+class EventDispatcher(object):
+    max_workers: int = ...
+    _pool: Union[ThreadPoolExecutor, None] = ...
+    _pool_lock: Lock = ...
+
+    def __init__(self, driver: ChromiumDriver, max_size: int = 10000, policy: str = 'drop', by_domain: bool = True):
+        self._driver: ChromiumDriver = ...
+        self._lanes: Dict[str, deque] = ...
+        self._lane_of: Dict[str, str] = ...
+        self._running: set = ...
+        self._warned: set = ...
+        self._lock: Lock = ...
+        self._size: int = ...
+        self._dropped: Dict[str, int] = ...
+        self.peak: int = ...
+        self.dispatched: int = ...
+        self.max_size: int = ...
+        self.policy: str = ...
+        self.by_domain: bool = ...
+
+    @property
+    def size(self) -> int: ...
+
+    @property
+    def depths(self) -> Dict[str, int]: ...
+
+    @property
+    def dropped(self) -> Dict[str, int]: ...
+
+    def set(self, max_size: int = None, policy: str = None, by_domain: bool = None) -> None: ...
+
+    def set_lane(self, method: str, lane: Union[str, None]) -> None: ...
+
+    def put(self, event: dict) -> bool: ...
+
+    def clear(self) -> None: ...
+
+    def close(self) -> None: ...
+
+    def _run_lane(self, lane: str) -> None: ...
+
+    @classmethod
+    def _get_pool(cls) -> ThreadPoolExecutor: ...
+
+
 class ChromiumDriver(object):
     _INITIAL_: str
     _STARTED_: str
@@ -25,34 +119,115 @@ class ChromiumDriver(object):
     type: str
     debug: bool
     has_alert: bool
+    lazy_decode: bool
     _websocket_url: str
-    _cur_id: int
+    _pipe: Union[PipeConnection, None]
+    _ids: count
     _ws = None
     _recv_th: Thread
-    _handle_event_th: Thread
     _stopped: Event
     _started: bool
     status: str
     event_handlers: dict
-    method_results: dict
-    event_queue: Queue
+    method_results: Dict[int, _Reply]
+    dispatcher: EventDispatcher
+    _sessions: Dict[str, ChromiumSessionDriver]
 
-    def __init__(self, tab_id: str, tab_type: str, address: str): ...
+    def __init__(self, tab_id: str, tab_type: str, address: str, pipe: PipeConnection = None): ...
 
     def _send(self, message: dict, timeout: float = None) -> dict: ...
 
+    def _next_id(self) -> int: ...
+
+    def _send_many(self, messages: List[dict], timeout: float = None) -> List[Union[dict, None]]: ...
+
+    def _get_result(self, message: dict, reply: _Reply, end_time: float = None) -> Union[dict, None]: ...
+
+    def _on_dialog(self, opened: bool) -> None: ...
+
+    def _release_replies(self) -> None: ...
+
     def _recv_loop(self) -> None: ...
 
-    def _handle_event_loop(self) -> None: ...
+    def _is_wanted(self, method: str) -> bool: ...
 
     def __getattr__(self, item: str) -> Callable: ...
 
     def call_method(self, _method: str, *args, **kwargs) -> dict: ...
 
+    def call_methods(self, cmds: List[Union[str, Tuple[str, dict]]], timeout: float = None) -> List[dict]: ...
+
+    @staticmethod
+    def _parse_result(result: Union[dict, None], method: str, params: dict) -> dict: ...
+
+    def start(self) -> bool: ...
+
+    def stop(self) -> bool: ...
+
+    def set_listener(self, event: str, callback: Union[Callable, None]) -> Union[Callable, None, bool]: ...
+
+    def get_listener(self, event: str) -> Union[Callable, None]: ...
+
+    def __str__(self) -> str: ...
+
+
+class ChromiumSessionDriver(ChromiumDriver):
+    session_id: Union[str, None]
+    _browser: ChromiumDriver
+
+    def __init__(self, tab_id: str, tab_type: str, browser_driver: ChromiumDriver): ...
+
+    def _send_many(self, messages: List[dict], timeout: float = None) -> List[Union[dict, None]]: ...
+
     def start(self) -> bool: ...
 
     def stop(self) -> bool: ...
 
+    def _on_detached(self) -> None: ...
+
+    def __str__(self) -> str: ...
+
+
+class AsyncChromiumDriver(object):
+    _INITIAL_: str
+    _STARTED_: str
+    _STOPPED_: str
+    id: str
+    address: str
+    type: str
+    debug: bool
+    has_alert: bool
+    _websocket_url: str
+    _cur_id: int
+    _ws = None
+    _loop: AbstractEventLoop
+    _recv_task: Union[Task, None]
+    _stopped: bool
+    _started: bool
+    status: str
+    event_handlers: dict
+    method_results: Dict[int, Future]
+
+    def __init__(self, tab_id: str, tab_type: str, address: str): ...
+
+    async def _send(self, message: dict, timeout: float = None) -> Union[dict, None]: ...
+
+    async def _recv_loop(self) -> None: ...
+
+    def _handle_event(self, event: dict) -> None: ...
+
+    def __getattr__(self, item: str) -> Callable: ...
+
+    async def call_method(self, _method: str, *args, **kwargs) -> dict: ...
+
+    async def start(self) -> bool: ...
+
+    async def stop(self) -> bool: ...
+
+    def stop_soon(self) -> None: ...
+
+    def _close(self) -> None: ...
+
     def set_listener(self, event: str, callback: Union[Callable, None]) -> Union[Callable, None, bool]: ...
 
     def get_listener(self, event: str) -> Union[Callable, None]: ...
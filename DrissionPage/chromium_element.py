@@ -3,21 +3,28 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
+from functools import lru_cache
 from os import sep
 from os.path import basename
 from pathlib import Path
 from time import perf_counter, sleep
+from urllib.parse import urlparse
 
 from .base import DrissionElement, BaseElement
 from .commons.constants import FRAME_ELEMENT, NoneElement, Settings
 from .commons.keys import keys_to_typing, keyDescriptionForString, keyDefinitions
-from .commons.locator import get_loc
-from .commons.web import make_absolute_link, get_ele_txt, format_html, is_js_func, location_in_viewport, offset_scroll
+from .commons.locator import get_loc, LOC_CACHE_SIZE
+from .commons.web import make_absolute_link, get_ele_txt, format_html, is_js_func, location_in_viewport, offset_scroll, \
+    open_resource_stream, read_stream
 from .errors import ContextLossError, ElementLossError, JavaScriptError, NoRectError, ElementNotFoundError, \
     CallMethodError, NoResourceError, CanNotClickError
 from .session_element import make_session_ele
 
 
+# 这些类型的节点不能直接生成普通元素对象
+_NOT_LAZY_CLASSES = ('Text', 'Comment', 'HTMLIFrameElement', 'HTMLFrameElement', 'ShadowRoot')
+
+
 class ChromiumElement(DrissionElement):
     """控制浏览器元素的对象"""
 
@@ -39,28 +46,13 @@ class ChromiumElement(DrissionElement):
         self._tag = None
         self._wait = None
 
-        if node_id and obj_id and backend_id:
-            self._node_id = node_id
-            self._obj_id = obj_id
-            self._backend_id = backend_id
-        elif node_id:
-            self._node_id = node_id
-            self._obj_id = self._get_obj_id(node_id)
-            self._backend_id = self._get_backend_id(self._node_id)
-        elif obj_id:
-            self._node_id = self._get_node_id(obj_id)
-            self._obj_id = obj_id
-            self._backend_id = self._get_backend_id(self._node_id)
-        elif backend_id:
-            self._obj_id = self._get_obj_id(backend_id=backend_id)
-            self._node_id = self._get_node_id(obj_id=self._obj_id)
-            self._backend_id = backend_id
-        else:
+        if not (node_id or obj_id or backend_id):
             raise ElementLossError
-
+        # 只保存已知的id，其余的在第一次使用时才获取
+        self._id_cache = {'node_id': node_id, 'obj_id': obj_id, 'backend_id': backend_id, 'doc_id': None}
         self._ids = ChromiumElementIds(self)
-        doc = self.run_js('return this.ownerDocument;')
-        self._doc_id = doc['objectId'] if doc else None
+        if obj_id:
+            page._track_ele(self)
 
     def __repr__(self):
         attrs = self.attrs
@@ -75,12 +67,52 @@ class ChromiumElement(DrissionElement):
         """
         return self.ele(loc_or_str, timeout)
 
+    @property
+    def _node_id(self):
+        """返回cdp中的node id，未获取时先获取"""
+        if not self._id_cache['node_id']:
+            self._id_cache['node_id'] = self._get_node_id(obj_id=self._obj_id)
+        return self._id_cache['node_id']
+
+    @property
+    def _obj_id(self):
+        """返回js中的object id，未获取时先获取"""
+        if not self._id_cache['obj_id']:
+            if self._id_cache['backend_id']:
+                self._id_cache['obj_id'] = self._get_obj_id(backend_id=self._id_cache['backend_id'])
+            else:
+                self._id_cache['obj_id'] = self._get_obj_id(node_id=self._id_cache['node_id'])
+            self.page._track_ele(self)
+        return self._id_cache['obj_id']
+
+    @property
+    def _backend_id(self):
+        """返回backend id，未获取时先获取"""
+        if not self._id_cache['backend_id']:
+            if self._id_cache['node_id']:
+                node = self.page.run_cdp('DOM.describeNode', nodeId=self._id_cache['node_id'])['node']
+            else:
+                node = self.page.run_cdp('DOM.describeNode', objectId=self._id_cache['obj_id'])['node']
+            self._id_cache['backend_id'] = node['backendNodeId']
+            self._tag = node['localName'].lower()
+        return self._id_cache['backend_id']
+
+    @property
+    def _doc_id(self):
+        """返回所在document的object id，未获取时先获取"""
+        if self._id_cache['doc_id'] is None:
+            doc = self.run_js('return this.ownerDocument;')
+            self._id_cache['doc_id'] = doc['objectId'] if doc else False
+        return self._id_cache['doc_id'] or None
+
     @property
     def tag(self):
         """返回元素tag"""
         if self._tag is None:
-            self._tag = self.page.run_cdp('DOM.describeNode',
-                                          backendNodeId=self._backend_id)['node']['localName'].lower()
+            backend_id = self._backend_id  # 尚未获取backend id时会同时得到tag
+            if self._tag is None:
+                self._tag = self.page.run_cdp('DOM.describeNode',
+                                              backendNodeId=backend_id)['node']['localName'].lower()
         return self._tag
 
     @property
@@ -414,6 +446,15 @@ class ChromiumElement(DrissionElement):
             return make_session_ele(self.inner_html, loc_or_str, single=False)
         return make_session_ele(self, loc_or_str, single=False)
 
+    def extract(self, loc_or_str, fields='text', timeout=None):
+        """在一次js调用中获取当前元素下级所有符合条件的元素的数据
+        :param loc_or_str: 元素的定位信息，可以是loc元组，或查询字符串
+        :param fields: 要获取的数据项，详见extract_data()
+        :param timeout: 等待元素出现的超时时间，默认与元素所在页面等待时间一致
+        :return: 每个元素的数据组成的列表
+        """
+        return extract_data(self, loc_or_str, fields, timeout)
+
     def _find_elements(self, loc_or_str, timeout=None, single=True, relative=False, raise_err=None):
         """返回当前元素下级符合条件的子元素、属性或节点文本，默认返回第一个
         :param loc_or_str: 元素的定位信息，可以是loc元组，或查询字符串
@@ -481,19 +522,33 @@ class ChromiumElement(DrissionElement):
             data = result['content']
         return data
 
-    def save(self, path=None, rename=None, timeout=None):
+    def save(self, path=None, rename=None, timeout=None, stream=False):
         """保存图片或其它有src属性的元素的资源
         :param path: 文件保存路径，为None时保存到当前文件夹
         :param rename: 文件名称，为None时从资源url获取
         :param timeout: 等待资源加载的超时时间
+        :param stream: 是否通过浏览器以流方式分块读取并写入文件，适合大文件，内存占用不随资源大小增长
         :return: None
         """
+        if stream:
+            src = self.prop('currentSrc') or self.attr('src')
+            frame = getattr(self.page, 'frame_id', None) or self.page.tab_id
+            handle = open_resource_stream(self.page, frame, src)
+            if handle:
+                path = path or '.'
+                rename = rename or basename(urlparse(src).path)
+                Path(path).mkdir(parents=True, exist_ok=True)
+                with open(f'{path}{sep}{rename}', 'wb') as f:
+                    for chunk in read_stream(self.page, handle):
+                        f.write(chunk)
+                return
+
         data = self.get_src(timeout=timeout)
         if not data:
             raise NoResourceError
 
         path = path or '.'
-        rename = rename or basename(self.prop('currentSrc'))
+        rename = rename or basename(urlparse(self.prop('currentSrc')).path)
         write_type = 'wb' if isinstance(data, bytes) else 'w'
 
         Path(path).mkdir(parents=True, exist_ok=True)
@@ -516,7 +571,8 @@ class ChromiumElement(DrissionElement):
                 sleep(.1)
 
         self.scroll.to_see(center=True)
-        sleep(1)
+        # 等待滚动后的两帧完成绘制
+        self.run_js('return new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));')
         left, top = self.location
         width, height = self.size
         left_top = (left, top)
@@ -649,10 +705,12 @@ class ChromiumElement(DrissionElement):
         :param backend_id: backend id
         :return: js中的object id
         """
+        group = self.page._object_group
         if node_id:
-            return self.page.run_cdp('DOM.resolveNode', nodeId=node_id)['object']['objectId']
+            return self.page.run_cdp('DOM.resolveNode', nodeId=node_id, objectGroup=group)['object']['objectId']
         else:
-            return self.page.run_cdp('DOM.resolveNode', backendNodeId=backend_id)['object']['objectId']
+            return self.page.run_cdp('DOM.resolveNode', backendNodeId=backend_id,
+                                     objectGroup=group)['object']['objectId']
 
     def _get_node_id(self, obj_id=None, backend_id=None):
         """根据传入object id或backend id获取cdp中的node id
@@ -1014,7 +1072,8 @@ class ChromiumShadowRoot(BaseElement):
 
     def _get_obj_id(self, back_id):
         """返回元素object id"""
-        return self.page.run_cdp('DOM.resolveNode', backendNodeId=back_id)['object']['objectId']
+        return self.page.run_cdp('DOM.resolveNode', backendNodeId=back_id,
+                                 objectGroup=self.page._object_group)['object']['objectId']
 
     def _get_backend_id(self, node_id):
         """返回元素object id"""
@@ -1094,8 +1153,9 @@ def find_by_xpath(ele, xpath, single, timeout, relative=True):
     type_txt = '9' if single else '7'
     node_txt = 'this.contentDocument' if ele.tag in FRAME_ELEMENT and not relative else 'this'
     js = make_js_for_find_ele_by_xpath(xpath, type_txt, node_txt)
+    group = ele.page._object_group
     r = ele.page.run_cdp_loaded('Runtime.callFunctionOn', functionDeclaration=js, objectId=ele.ids.obj_id,
-                                returnByValue=False, awaitPromise=True, userGesture=True)
+                                returnByValue=False, awaitPromise=True, userGesture=True, objectGroup=group)
     if r['result']['type'] == 'string':
         return r['result']['value']
 
@@ -1103,27 +1163,27 @@ def find_by_xpath(ele, xpath, single, timeout, relative=True):
         if 'The result is not a node set' in r['result']['description']:
             js = make_js_for_find_ele_by_xpath(xpath, '1', node_txt)
             r = ele.page.run_cdp_loaded('Runtime.callFunctionOn', functionDeclaration=js, objectId=ele.ids.obj_id,
-                                        returnByValue=False, awaitPromise=True, userGesture=True)
+                                        returnByValue=False, awaitPromise=True, userGesture=True, objectGroup=group)
             return r['result']['value']
         else:
             raise SyntaxError(f'查询语句错误：\n{r}')
 
-    end_time = perf_counter() + timeout
-    while (r['result']['subtype'] == 'null'
-           or r['result']['description'] == 'NodeList(0)') and perf_counter() < end_time:
-        r = ele.page.run_cdp_loaded('Runtime.callFunctionOn', functionDeclaration=js, objectId=ele.ids.obj_id,
-                                    returnByValue=False, awaitPromise=True, userGesture=True)
+    if (r['result']['subtype'] == 'null' or r['result']['description'] in ('NodeList(0)', 'Array(0)')) \
+            and timeout > 0:
+        r = ele.page.run_cdp_loaded('Runtime.callFunctionOn', functionDeclaration=make_js_for_wait(js, timeout),
+                                    objectId=ele.ids.obj_id, returnByValue=False, awaitPromise=True, userGesture=True,
+                                    objectGroup=group)
 
     if single:
         return NoneElement() if r['result']['subtype'] == 'null' \
-            else make_chromium_ele(ele.page, obj_id=r['result']['objectId'])
+            else make_chromium_ele(ele.page, obj_id=r['result']['objectId'], class_name=r['result'].get('className'))
 
     if r['result']['description'] == 'NodeList(0)':
         return []
     else:
         r = ele.page.run_cdp_loaded('Runtime.getProperties', objectId=r['result']['objectId'],
                                     ownProperties=True)['result']
-        return [make_chromium_ele(ele.page, obj_id=i['value']['objectId'])
+        return [make_chromium_ele(ele.page, obj_id=i['value']['objectId'], class_name=i['value'].get('className'))
                 if i['value']['type'] == 'object' else i['value']['value']
                 for i in r[:-1]]
 
@@ -1140,43 +1200,50 @@ def find_by_css(ele, selector, single, timeout):
     find_all = '' if single else 'All'
     node_txt = 'this.contentDocument' if ele.tag in ('iframe', 'frame', 'shadow-root') else 'this'
     js = f'function(){{return {node_txt}.querySelector{find_all}("{selector}");}}'
+    group = ele.page._object_group
     r = ele.page.run_cdp_loaded('Runtime.callFunctionOn', functionDeclaration=js, objectId=ele.ids.obj_id,
-                                returnByValue=False, awaitPromise=True, userGesture=True)
+                                returnByValue=False, awaitPromise=True, userGesture=True, objectGroup=group)
 
-    end_time = perf_counter() + timeout
-    while ('exceptionDetails' in r or r['result']['subtype'] == 'null' or
-           r['result']['description'] == 'NodeList(0)') and perf_counter() < end_time:
-        r = ele.page.run_cdp_loaded('Runtime.callFunctionOn', functionDeclaration=js, objectId=ele.ids.obj_id,
-                                    returnByValue=False, awaitPromise=True, userGesture=True)
+    if ('exceptionDetails' in r or r['result']['subtype'] == 'null' or
+        r['result']['description'] == 'NodeList(0)') and timeout > 0:
+        r = ele.page.run_cdp_loaded('Runtime.callFunctionOn', functionDeclaration=make_js_for_wait(js, timeout),
+                                    objectId=ele.ids.obj_id, returnByValue=False, awaitPromise=True, userGesture=True,
+                                    objectGroup=group)
 
     if 'exceptionDetails' in r:
         raise SyntaxError(f'查询语句错误：\n{r}')
 
     if single:
         return NoneElement() if r['result']['subtype'] == 'null' \
-            else make_chromium_ele(ele.page, obj_id=r['result']['objectId'])
+            else make_chromium_ele(ele.page, obj_id=r['result']['objectId'], class_name=r['result'].get('className'))
 
     if r['result']['description'] == 'NodeList(0)':
         return []
     else:
         r = ele.page.run_cdp_loaded('Runtime.getProperties', objectId=r['result']['objectId'],
                                     ownProperties=True)['result']
-        return [make_chromium_ele(ele.page, obj_id=i['value']['objectId']) for i in r]
+        return [make_chromium_ele(ele.page, obj_id=i['value']['objectId'], class_name=i['value'].get('className'))
+                for i in r if i['value']['type'] == 'object']
 
 
-def make_chromium_ele(page, node_id=None, obj_id=None):
+def make_chromium_ele(page, node_id=None, obj_id=None, class_name=None):
     """根据node id或object id生成相应元素对象
     :param page: ChromiumPage对象
     :param node_id: 元素的node id
     :param obj_id: 元素的object id
+    :param class_name: 元素在js中的类名，传入时可判断元素类型，普通元素不再获取其它id
     :return: ChromiumElement对象或ChromiumFrame对象
     """
+    if obj_id and class_name and class_name not in _NOT_LAZY_CLASSES:
+        return ChromiumElement(page, obj_id=obj_id)
+
     if node_id:
-        node = page.run_cdp('DOM.describeNode', nodeId=node_id)
+        node, obj = page.run_cdp_many([('DOM.describeNode', {'nodeId': node_id}),
+                                       ('DOM.resolveNode', {'nodeId': node_id, 'objectGroup': page._object_group})])
         if node['node']['nodeName'] in ('#text', '#comment'):
             return node['node']['nodeValue']
         backend_id = node['node']['backendNodeId']
-        obj_id = page.run_cdp('DOM.resolveNode', nodeId=node_id)['object']['objectId']
+        obj_id = obj['object']['objectId']
 
     elif obj_id:
         node = page.run_cdp('DOM.describeNode', objectId=obj_id)
@@ -1189,6 +1256,7 @@ def make_chromium_ele(page, node_id=None, obj_id=None):
         raise ElementLossError
 
     ele = ChromiumElement(page, obj_id=obj_id, node_id=node_id, backend_id=backend_id)
+    ele._tag = node['node']['localName'].lower()
     if ele.tag in FRAME_ELEMENT:
         from .chromium_frame import ChromiumFrame
         ele = ChromiumFrame(page, ele)
@@ -1196,6 +1264,127 @@ def make_chromium_ele(page, node_id=None, obj_id=None):
     return ele
 
 
+def make_chromium_eles(page, node_ids):
+    """根据多个node id生成元素对象，在一次往返中获取所有节点信息
+    :param page: ChromiumPage对象
+    :param node_ids: 元素的node id组成的列表
+    :return: ChromiumElement对象、ChromiumFrame对象或文本组成的列表
+    """
+    nodes = page.run_cdp_many([('DOM.describeNode', {'nodeId': i}) for i in node_ids])
+    r = []
+    for node_id, node in zip(node_ids, nodes):
+        node = node['node']
+        if node['nodeName'] in ('#text', '#comment'):
+            r.append(node['nodeValue'])
+        elif node['localName'].lower() in FRAME_ELEMENT:
+            r.append(make_chromium_ele(page, node_id=node_id))
+        else:
+            ele = ChromiumElement(page, node_id=node_id, backend_id=node['backendNodeId'])
+            ele._tag = node['localName'].lower()
+            r.append(ele)
+    return r
+
+
+def extract_data(page_or_ele, loc, fields='text', timeout=None):
+    """在一次js调用中获取所有符合条件的元素的数据，结果以值的形式返回
+    :param page_or_ele: 页面对象或元素对象
+    :param loc: 定位符
+    :param fields: 要获取的数据项，为str时返回由值组成的列表，为list或tuple时以各项为键，为dict时以键为名、值为数据项；
+                   数据项可以是'text'、'raw_text'、'html'、'inner_html'、'tag'、'link'、'href'、'src'、'attrs'或attribute名称
+    :param timeout: 等待元素出现的超时时间
+    :return: 每个元素的数据组成的列表，不是元素的节点返回其文本
+    """
+    loc_by, loc_str = get_loc(loc)
+    if isinstance(page_or_ele, ChromiumElement):
+        page = page_or_ele.page
+        obj_id = page_or_ele.ids.obj_id
+        if loc_by == 'xpath' and loc_str.lstrip().startswith('/'):
+            loc_str = f'.{loc_str}'
+        elif loc_by == 'css selector' and loc_str.lstrip().startswith('>'):
+            loc_str = f':scope{loc_str}'
+    else:
+        page = page_or_ele
+        page.wait.load_complete()
+        obj_id = page._root_id
+
+    single = isinstance(fields, str)
+    if single:
+        fields = {'value': fields}
+    elif isinstance(fields, (list, tuple)):
+        fields = {i: i for i in fields}
+    elif not isinstance(fields, dict):
+        raise TypeError('fields参数只能是str、list、tuple或dict。')
+
+    args = [{'value': 'xpath' if loc_by == 'xpath' else 'css'}, {'value': loc_str}, {'value': fields}]
+    timeout = timeout if timeout is not None else page.timeout
+    end_time = perf_counter() + timeout
+    while True:
+        r = page.run_cdp('Runtime.callFunctionOn', functionDeclaration=_EXTRACT_JS, objectId=obj_id,
+                         arguments=args, returnByValue=True, awaitPromise=True, userGesture=True)
+        if 'exceptionDetails' in r:
+            raise SyntaxError(f'查询语句错误：\n{r}')
+
+        data = r['result'].get('value', None)
+        if data or perf_counter() >= end_time:
+            break
+        wait_dom_change(page, obj_id, end_time - perf_counter())
+
+    if not data:
+        return []
+
+    text_keys = [k for k, v in fields.items() if v == 'text']
+    raw_keys = [k for k, v in fields.items() if v in ('raw_text', 'innerText')]
+    for row in data:
+        if isinstance(row, dict):
+            for k in text_keys:
+                row[k] = get_ele_txt(make_session_ele(row[k]))
+            for k in raw_keys:
+                row[k] = format_html(row[k])
+
+    return [i['value'] if isinstance(i, dict) else i for i in data] if single else data
+
+
+_EXTRACT_JS = '''function(type, loc, fields){
+    var doc = this.ownerDocument || this;
+    var nodes = [];
+    if(type == 'xpath'){
+        var r = doc.evaluate(loc, this, null, 7, null);
+        for(var i = 0; i < r.snapshotLength; i++){nodes.push(r.snapshotItem(i));}
+    }else{
+        var root = (this.tagName && /^i?frame$/i.test(this.tagName)) ? this.contentDocument : this;
+        nodes = root.querySelectorAll(loc);
+    }
+    function absLink(v){
+        if(!v || /^(javascript|mailto):/i.test(v)){return v;}
+        try{return new URL(v, doc.baseURI).href;}catch(e){return v;}
+    }
+    var result = [];
+    for(var n = 0; n < nodes.length; n++){
+        var e = nodes[n];
+        if(e.nodeType != 1){result.push(e.nodeValue); continue;}
+        var row = {};
+        for(var k in fields){
+            var f = fields[k];
+            if(f == 'text' || f == 'html' || f == 'outerHTML'){row[k] = e.outerHTML;}
+            else if(f == 'raw_text' || f == 'innerText'){row[k] = e.innerText;}
+            else if(f == 'inner_html' || f == 'innerHTML'){row[k] = e.innerHTML;}
+            else if(f == 'tag'){row[k] = e.localName.toLowerCase();}
+            else if(f == 'href' || f == 'src'){row[k] = absLink(e.getAttribute(f));}
+            else if(f == 'link'){row[k] = absLink(e.getAttribute('href')) || absLink(e.getAttribute('src'));}
+            else if(f == 'attrs'){
+                var a = {};
+                for(var j = 0; j < e.attributes.length; j++){a[e.attributes[j].name] = e.attributes[j].value;}
+                row[k] = a;
+            }
+            else{row[k] = e.getAttribute(f);}
+        }
+        result.push(row);
+    }
+    return result;
+}'''
+
+
+@lru_cache(maxsize=LOC_CACHE_SIZE)
 def make_js_for_find_ele_by_xpath(xpath, type_txt, node_txt):
     """生成用xpath在元素中查找元素的js文本
     :param xpath: xpath文本
@@ -1238,6 +1427,77 @@ else{a.push(e.snapshotItem(i));}}"""
     return js
 
 
+def make_js_for_wait(js, timeout):
+    """把查找元素的js函数包装成等待函数，dom变化时重新查找，找到或超时才返回
+    :param js: 查找元素的js函数文本
+    :param timeout: 超时时间
+    :return: js文本
+    """
+    return f'''function(){{
+    const self = this;
+    const find = {js};
+    function tryFind(){{
+        try{{
+            const r = find.call(self);
+            const empty = (r instanceof NodeList || Array.isArray(r)) && r.length === 0;
+            return (r === null || r === undefined || empty) ? null : r;
+        }}catch(e){{return null;}}
+    }}
+    const first = tryFind();
+    if(first !== null){{return first;}}
+    return new Promise(function(resolve){{
+        let timer;
+        const observer = new MutationObserver(function(){{
+            const r = tryFind();
+            if(r !== null){{observer.disconnect(); clearTimeout(timer); resolve(r);}}
+        }});
+        {_OBSERVE_JS}
+        timer = setTimeout(function(){{observer.disconnect(); resolve(find.call(self));}}, {int(timeout * 1000)});
+    }});
+}}'''
+
+
+def wait_dom_change(page, obj_id, timeout):
+    """等待js对象所在文档的dom发生变化，变化时立即返回
+    :param page: 页面对象
+    :param obj_id: js对象的object id，在其所在文档中监听
+    :param timeout: 最长等待秒数
+    :return: 是否发生了变化
+    """
+    if timeout <= 0:
+        return False
+    if not obj_id:
+        sleep(min(timeout, .1))
+        return False
+
+    try:
+        r = page.run_cdp('Runtime.callFunctionOn', functionDeclaration=_WAIT_DOM_CHANGE_JS, objectId=obj_id,
+                         arguments=[{'value': int(timeout * 1000)}], returnByValue=True, awaitPromise=True)
+    except (ContextLossError, ElementLossError):  # 页面已刷新，或在等待期间跳转
+        sleep(min(timeout, .1))
+        return False
+    return bool(r and r['result'].get('value', False))
+
+
+# 在this所在文档、frame内文档和shadow root中监听dom变化
+_OBSERVE_JS = '''const targets = [self.ownerDocument || self];
+        if(self.contentDocument){targets.push(self.contentDocument);}
+        if(self.nodeType == 11){targets.push(self);}
+        for(const t of targets){
+            observer.observe(t, {childList: true, subtree: true, attributes: true, characterData: true});
+        }'''
+
+_WAIT_DOM_CHANGE_JS = '''function(timeout){
+    const self = this;
+    return new Promise(function(resolve){
+        let timer;
+        const observer = new MutationObserver(function(){observer.disconnect(); clearTimeout(timer); resolve(true);});
+        ''' + _OBSERVE_JS + '''
+        timer = setTimeout(function(){observer.disconnect(); resolve(false);}, timeout);
+    });
+}'''
+
+
 def run_js(page_or_ele, script, as_expr=False, timeout=None, args=None):
     """运行javascript代码
     :param page_or_ele: 页面对象或元素对象
@@ -1259,7 +1519,8 @@ def run_js(page_or_ele, script, as_expr=False, timeout=None, args=None):
     try:
         if as_expr:
             res = page.run_cdp('Runtime.evaluate', expression=script, returnByValue=False,
-                               awaitPromise=True, userGesture=True, timeout=timeout * 1000)
+                               awaitPromise=True, userGesture=True, timeout=timeout * 1000,
+                               objectGroup=page._object_group)
 
         else:
             args = args or ()
@@ -1267,7 +1528,7 @@ def run_js(page_or_ele, script, as_expr=False, timeout=None, args=None):
                 script = f'function(){{{script}}}'
             res = page.run_cdp('Runtime.callFunctionOn', functionDeclaration=script, objectId=obj_id,
                                arguments=[convert_argument(arg) for arg in args], returnByValue=False,
-                               awaitPromise=True, userGesture=True)
+                               awaitPromise=True, userGesture=True, objectGroup=page._object_group)
 
     except ContextLossError:
         if is_page:
@@ -1307,7 +1568,7 @@ def parse_js_result(page, ele, result):
             elif class_name == 'HTMLDocument':
                 return result
             else:
-                return make_chromium_ele(page, obj_id=result['objectId'])
+                return make_chromium_ele(page, obj_id=result['objectId'], class_name=class_name)
 
         elif sub_type == 'array':
             r = page.run_cdp('Runtime.getProperties', objectId=result['objectId'],
@@ -1501,38 +1762,38 @@ class Locations(object):
     @property
     def location(self):
         """返回元素左上角的绝对坐标"""
-        cl = self.viewport_location
-        return self._get_page_coord(cl[0], cl[1])
+        m, sx, sy = self._get_model_and_scroll()
+        x, y = _quad_location(m['border'])
+        return x + sx, y + sy
 
     @property
     def midpoint(self):
         """返回元素中间点的绝对坐标"""
-        cl = self.viewport_midpoint
-        return self._get_page_coord(cl[0], cl[1])
+        m, sx, sy = self._get_model_and_scroll()
+        x, y = _quad_midpoint(m['border'])
+        return x + sx, y + sy
 
     @property
     def click_point(self):
         """返回元素接受点击的点的绝对坐标"""
-        cl = self.viewport_click_point
-        return self._get_page_coord(cl[0], cl[1])
+        m, sx, sy = self._get_model_and_scroll()
+        x, y = _quad_click_point(m)
+        return x + sx, y + sy
 
     @property
     def viewport_location(self):
         """返回元素左上角在视口中的坐标"""
-        m = self._get_viewport_rect('border')
-        return int(m[0]), int(m[1])
+        return _quad_location(self._get_viewport_rect('border'))
 
     @property
     def viewport_midpoint(self):
         """返回元素中间点在视口中的坐标"""
-        m = self._get_viewport_rect('border')
-        return int(m[0] + (m[2] - m[0]) // 2), int(m[3] + (m[5] - m[3]) // 2)
+        return _quad_midpoint(self._get_viewport_rect('border'))
 
     @property
     def viewport_click_point(self):
         """返回元素接受点击的点视口坐标"""
-        m = self._get_viewport_rect('padding')
-        return int(self.viewport_midpoint[0]), int(m[1]) + 1
+        return _quad_click_point(self._get_box_model())
 
     @property
     def screen_location(self):
@@ -1563,17 +1824,37 @@ class Locations(object):
         :param quad: 方框类型，margin border padding
         :return: 四个角坐标，大小为0时返回None
         """
-        return self._ele.page.run_cdp('DOM.getBoxModel', backendNodeId=self._ele.ids.backend_id)['model'][quad]
+        return self._get_box_model()[quad]
 
-    def _get_page_coord(self, x, y):
-        """根据视口坐标获取绝对坐标"""
-        # js = 'return document.documentElement.scrollLeft+" "+document.documentElement.scrollTop;'
-        # xy = self._ele.run_js(js)
-        # sx, sy = xy.split(' ')
-        r = self._ele.page.run_cdp_loaded('Page.getLayoutMetrics')['visualViewport']
-        sx = r['pageX']
-        sy = r['pageY']
-        return x + sx, y + sy
+    def _get_box_model(self):
+        """返回元素盒模型数据"""
+        return self._ele.page.run_cdp('DOM.getBoxModel', backendNodeId=self._ele.ids.backend_id)['model']
+
+    def _get_model_and_scroll(self):
+        """在一次往返中获取元素盒模型和页面滚动位置
+        :return: 盒模型数据、页面横向滚动距离、纵向滚动距离组成的tuple
+        """
+        page = self._ele.page
+        page.wait.load_complete()
+        m, r = page.run_cdp_many([('DOM.getBoxModel', {'backendNodeId': self._ele.ids.backend_id}),
+                                  'Page.getLayoutMetrics'])
+        r = r['visualViewport']
+        return m['model'], r['pageX'], r['pageY']
+
+
+def _quad_location(m):
+    """返回方框左上角坐标"""
+    return int(m[0]), int(m[1])
+
+
+def _quad_midpoint(m):
+    """返回方框中点坐标"""
+    return int(m[0] + (m[2] - m[0]) // 2), int(m[3] + (m[5] - m[3]) // 2)
+
+
+def _quad_click_point(model):
+    """根据盒模型返回元素接受点击的点"""
+    return _quad_midpoint(model['border'])[0], int(model['padding'][1]) + 1
 
 
 class Click(object):
@@ -2095,7 +2376,7 @@ class ChromiumElementWaiter(object):
         while perf_counter() < end_time:
             if not self._ele.states.is_enabled or not self._ele.states.is_alive:
                 return True
-            sleep(.05)
+            self._wait_change(end_time)
 
         return False
 
@@ -2112,10 +2393,19 @@ class ChromiumElementWaiter(object):
         while perf_counter() < end_time:
             if self._ele.states.__getattribute__(attr) == mode:
                 return True
-            sleep(.05)
+            self._wait_change(end_time)
 
         return False
 
+    def _wait_change(self, end_time, gap=.05):
+        """等待元素所在文档发生变化，没有变化时最多等待gap秒，
+        滚动、布局或样式表引起的显示、遮挡等状态改变不产生dom变化，因此不能等待太久
+        :param end_time: 结束等待的时间点
+        :param gap: 最长等待秒数
+        :return: None
+        """
+        wait_dom_change(self._ele.page, self._ele.ids.obj_id, min(end_time - perf_counter(), gap))
+
 
 class Pseudo(object):
     def __init__(self, ele):
@@ -22,10 +22,7 @@ class ChromiumElement(DrissionElement):
                  node_id: str = None, obj_id: str = None, backend_id: str = None):
         self._tag: str = ...
         self.page: Union[ChromiumPage, WebPage] = ...
-        self._node_id: str = ...
-        self._obj_id: str = ...
-        self._backend_id: str = ...
-        self._doc_id: str = ...
+        self._id_cache: dict = ...
         self._ids: ChromiumElementIds = ...
         self._scroll: ChromiumElementScroll = ...
         self._click: Click = ...
@@ -38,6 +35,18 @@ class ChromiumElement(DrissionElement):
 
     def __repr__(self) -> str: ...
 
+    @property
+    def _node_id(self) -> str: ...
+
+    @property
+    def _obj_id(self) -> str: ...
+
+    @property
+    def _backend_id(self) -> str: ...
+
+    @property
+    def _doc_id(self) -> Union[str, None]: ...
+
     def __call__(self,
                  loc_or_str: Union[Tuple[str, str], str],
                  timeout: float = None) -> Union[ChromiumElement, str, None]: ...
@@ -169,6 +178,9 @@ class ChromiumElement(DrissionElement):
 
     def s_eles(self, loc_or_str: Union[Tuple[str, str], str] = None) -> List[Union[SessionElement, str]]: ...
 
+    def extract(self, loc_or_str: Union[Tuple[str, str], str], fields: Union[str, list, tuple, dict] = 'text',
+                timeout: float = None) -> List[Union[dict, str, None]]: ...
+
     def _find_elements(self, loc_or_str: Union[Tuple[str, str], str], timeout: float = None,
                        single: bool = True, relative: bool = False, raise_err: bool = False) \
             -> Union[ChromiumElement, ChromiumFrame, str, NoneElement,
@@ -178,7 +190,8 @@ class ChromiumElement(DrissionElement):
 
     def get_src(self, timeout: float = None, base64_to_bytes: bool = True) -> Union[bytes, str, None]: ...
 
-    def save(self, path: [str, bool] = None, rename: str = None, timeout: float = None) -> None: ...
+    def save(self, path: [str, bool] = None, rename: str = None, timeout: float = None,
+             stream: bool = False) -> None: ...
 
     def get_screenshot(self, path: [str, Path] = None, as_bytes: [bool, str] = None,
                        as_base64: [bool, str] = None) -> Union[str, bytes]: ...
@@ -359,13 +372,34 @@ def find_by_css(ele: ChromiumElement,
                 timeout: float) -> Union[ChromiumElement, List[ChromiumElement], NoneElement]: ...
 
 
-def make_chromium_ele(page: ChromiumBase, node_id: str = ..., obj_id: str = ...) \
+def make_chromium_ele(page: ChromiumBase, node_id: str = ..., obj_id: str = ..., class_name: str = None) \
         -> Union[ChromiumElement, ChromiumFrame, str]: ...
 
 
+def make_chromium_eles(page: ChromiumBase, node_ids: List[str]) -> List[Union[ChromiumElement, ChromiumFrame, str]]: ...
+
+
+def extract_data(page_or_ele: Union[ChromiumBase, ChromiumElement], loc: Union[Tuple[str, str], str],
+                 fields: Union[str, list, tuple, dict] = 'text', timeout: float = None) -> List[Union[dict, str, None]]: ...
+
+
+_EXTRACT_JS: str
+
+
 def make_js_for_find_ele_by_xpath(xpath: str, type_txt: str, node_txt: str) -> str: ...
 
 
+def make_js_for_wait(js: str, timeout: float) -> str: ...
+
+
+def wait_dom_change(page: ChromiumBase, obj_id: Union[str, None], timeout: float) -> bool: ...
+
+
+_OBSERVE_JS: str
+
+_WAIT_DOM_CHANGE_JS: str
+
+
 def run_js(page_or_ele: Union[ChromiumBase, ChromiumElement, ChromiumShadowRoot], script: str,
            as_expr: bool = False, timeout: float = None, args: tuple = ...) -> Any: ...
 
@@ -440,7 +474,18 @@ class Locations(object):
 
     def _get_viewport_rect(self, quad: str) -> Union[list, None]: ...
 
-    def _get_page_coord(self, x: int, y: int) -> Tuple[int, int]: ...
+    def _get_box_model(self) -> dict: ...
+
+    def _get_model_and_scroll(self) -> Tuple[dict, float, float]: ...
+
+
+def _quad_location(m: list) -> Tuple[int, int]: ...
+
+
+def _quad_midpoint(m: list) -> Tuple[int, int]: ...
+
+
+def _quad_click_point(model: dict) -> Tuple[int, int]: ...
 
 
 class Click(object):
@@ -579,6 +624,8 @@ class ChromiumElementWaiter(object):
 
     def _wait_state(self, attr: str, mode: bool = False, timeout: float = None) -> bool: ...
 
+    def _wait_change(self, end_time: float, gap: float = .05) -> None: ...
+
 
 class Pseudo(object):
     def __init__(self, ele: ChromiumElement):
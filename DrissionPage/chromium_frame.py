@@ -69,7 +69,10 @@ class ChromiumFrame(ChromiumBase):
         try:
             super()._driver_init(tab_id)
         except:
-            self._control_session.get(f'http://{self.address}/json')
+            page = self.page
+            while not hasattr(page, 'browser_driver'):  # 所在页面可能是标签页或另一个frame
+                page = page.page
+            page.browser_driver.Target.getTargets()  # 让浏览器刷新target列表，管道连接时也可用
             super()._driver_init(tab_id)
 
     def _reload(self):
@@ -530,6 +533,16 @@ class ChromiumFrame(ChromiumBase):
         self.page.remove_ele(new_ele)
         return r
 
+    def extract(self, loc_or_str, fields='text', timeout=None):
+        """在一次js调用中获取frame内所有符合条件的元素的数据
+        :param loc_or_str: 元素的定位信息，可以是loc元组，或查询字符串
+        :param fields: 要获取的数据项，详见ChromiumBase.extract()
+        :param timeout: 等待元素出现的超时时间
+        :return: 每个元素的数据组成的列表
+        """
+        self._check_ok()
+        return self.doc_ele.extract(loc_or_str, fields, timeout)
+
     def _find_elements(self, loc_or_ele, timeout=None, single=True, relative=False, raise_err=None):
         """在frame内查找单个元素
         :param loc_or_ele: 定位符或元素对象
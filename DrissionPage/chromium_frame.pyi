@@ -169,6 +169,9 @@ class ChromiumFrame(ChromiumBase):
                         right_bottom: Tuple[int, int] = None,
                         ele: ChromiumElement = None) -> Union[str, bytes]: ...
 
+    def extract(self, loc_or_str: Union[Tuple[str, str], str], fields: Union[str, list, tuple, dict] = 'text',
+                timeout: float = None) -> List[Union[dict, str, None]]: ...
+
     def _find_elements(self, loc_or_ele: Union[Tuple[str, str], str, ChromiumElement, ChromiumFrame],
                        timeout: float = None, single: bool = True, relative: bool = False, raise_err: bool = None) \
             -> Union[ChromiumElement, ChromiumFrame, None, List[Union[ChromiumElement, ChromiumFrame]]]: ...
@@ -5,7 +5,10 @@
 """
 from pathlib import Path
 from platform import system
-from threading import Thread
+from shutil import rmtree
+from subprocess import TimeoutExpired
+from collections import OrderedDict
+from threading import Thread, Condition, RLock
 from time import perf_counter, sleep
 from warnings import warn
 
@@ -13,8 +16,8 @@ from requests import Session
 
 from .chromium_base import ChromiumBase, Timeout, ChromiumBaseSetter, ChromiumBaseWaiter
 from .chromium_driver import ChromiumDriver
-from .chromium_tab import ChromiumTab
-from .commons.browser import connect_browser
+from .chromium_tab import ChromiumTab, TabPool
+from .commons.browser import connect_browser, launch_pipe_browser
 from .commons.tools import port_is_using
 from .commons.web import set_session_cookies
 from .configs.chromium_options import ChromiumOptions
@@ -33,6 +36,8 @@ class ChromiumPage(ChromiumBase):
         """
         self._download_set = None
         self._download_path = None
+        self._process = None
+        self._tmp_user_path = None
         super().__init__(addr_driver_opts, tab_id, timeout)
 
     def _set_start_options(self, addr_driver_opts, none):
@@ -77,7 +82,19 @@ class ChromiumPage(ChromiumBase):
         """
         self._chromium_init()
 
-        if not self._tab_obj:  # 不是传入driver的情况
+        if self._tab_obj:  # 传入driver的情况
+            self._browser_driver_init()
+
+        elif getattr(self._driver_options, 'remote_debugging_pipe', False):
+            driver, self._process, self._tmp_user_path = launch_pipe_browser(self._driver_options)
+            self._browser_driver_init(driver)
+            if not tab_id:
+                if not self._targets.wait_for(lambda: self._targets.tabs, 10):
+                    raise BrowserConnectError('浏览器连接失败，可能是浏览器版本原因。')
+                tab_id = self._targets.tabs[0]
+            self._driver_init(tab_id)
+
+        else:
             connect_browser(self._driver_options)
             if not tab_id:
                 json = self._control_session.get(f'http://{self.address}/json').json()
@@ -86,18 +103,37 @@ class ChromiumPage(ChromiumBase):
                     raise BrowserConnectError('浏览器连接失败，可能是浏览器版本原因。')
                 tab_id = tab_id[0]
 
+            self._browser_driver_init()
             self._driver_init(tab_id)
 
         self._page_init()
         self._get_document()
         self._first_run = False
 
-    def _page_init(self):
-        """页面相关设置"""
-        ws = self._control_session.get(f'http://{self.address}/json/version').json()['webSocketDebuggerUrl']
-        self._browser_driver = ChromiumDriver(ws.split('/')[-1], 'browser', self.address)
+    def _browser_driver_init(self, driver=None):
+        """创建浏览器级别的driver
+        :param driver: 已连接的浏览器级别driver，为None时通过http接口获取地址并连接
+        :return: None
+        """
+        if driver is None:
+            ws = self._control_session.get(f'http://{self.address}/json/version').json()['webSocketDebuggerUrl']
+            driver = ChromiumDriver(ws.split('/')[-1], 'browser', self.address)
+            order = [i['id'] for i in self._control_session.get(f'http://{self.address}/json').json()]
+            address = self.address
+        else:
+            order = address = None
+        self._browser_driver = driver
         self._browser_driver.start()
+        self._targets = TargetRegistry(self._browser_driver, order, address)
+
+    def _get_flatten_driver(self):
+        """返回以flatten方式连接target所用的浏览器driver，未开启该模式时返回None"""
+        opt = self._driver_options
+        flatten = getattr(opt, 'flatten_sessions', False) or getattr(opt, 'remote_debugging_pipe', False)
+        return self._browser_driver if flatten else None
 
+    def _page_init(self):
+        """页面相关设置"""
         self._alert = Alert()
         self._tab_obj.Page.javascriptDialogOpening = self._on_alert_open
         self._tab_obj.Page.javascriptDialogClosed = self._on_alert_close
@@ -131,8 +167,12 @@ class ChromiumPage(ChromiumBase):
     @property
     def tabs(self):
         """返回所有标签页id组成的列表"""
-        j = self._control_session.get(f'http://{self.address}/json').json()  # 不要改用cdp
-        return [i['id'] for i in j if i['type'] == 'page']
+        return self._targets.tabs
+
+    @property
+    def targets(self):
+        """返回由Target事件维护的标签页信息表对象"""
+        return self._targets
 
     @property
     def main_tab(self):
@@ -140,7 +180,7 @@ class ChromiumPage(ChromiumBase):
 
     @property
     def latest_tab(self):
-        """返回最新的标签页id，最新标签页指最后创建或最后被激活的"""
+        """返回最新的标签页id，最新标签页指最后创建或最后由本库激活的，不包括用户手动切换的"""
         return self.tabs[0]
 
     @property
@@ -194,6 +234,14 @@ class ChromiumPage(ChromiumBase):
         tab_id = tab_id or self.tab_id
         return ChromiumTab(self, tab_id)
 
+    def tab_pool(self, size=4, queue_size=None):
+        """新建若干标签页，返回用它们并发执行任务的池对象
+        :param size: 标签页数量
+        :param queue_size: 待执行任务队列的最大长度，为None时为size的2倍
+        :return: TabPool对象
+        """
+        return TabPool(self, size, queue_size)
+
     def find_tabs(self, title=None, url=None, tab_type=None, single=True):
         """查找符合条件的tab，返回它们的id组成的列表
         :param title: 要匹配title的文本
@@ -202,7 +250,7 @@ class ChromiumPage(ChromiumBase):
         :param single: 是否返回首个结果的id，为False返回所有信息
         :return: tab id或tab dict
         """
-        tabs = self._control_session.get(f'http://{self.address}/json').json()  # 不要改用cdp
+        tabs = self._targets.infos()
         if isinstance(tab_type, str):
             tab_type = {tab_type}
         elif isinstance(tab_type, (list, tuple, set)):
@@ -221,17 +269,9 @@ class ChromiumPage(ChromiumBase):
         :return: 新标签页的id
         """
         if switch_to:
-            begin_tabs = set(self.tabs)
-            len_tabs = len(begin_tabs)
             tid = self.run_cdp('Target.createTarget', url='')['targetId']
-
-            tabs = self.tabs
-            while len(tabs) == len_tabs:
-                tabs = self.tabs
-                sleep(.005)
-
-            new_tab = set(tabs) - begin_tabs
-            self._to_tab(new_tab.pop(), read_doc=False)
+            self._targets.wait_for(lambda: tid in self._targets, self.timeout)
+            self._to_tab(tid, read_doc=False)
             if url:
                 self.get(url)
 
@@ -274,7 +314,7 @@ class ChromiumPage(ChromiumBase):
             tab_id = self.latest_tab
 
         if activate:
-            self._control_session.get(f'http://{self.address}/json/activate/{tab_id}')
+            self._activate_tab(tab_id)
 
         if tab_id == self.tab_id:
             return
@@ -284,6 +324,14 @@ class ChromiumPage(ChromiumBase):
         if read_doc and self.ready_state in ('complete', None):
             self._get_document()
 
+    def _activate_tab(self, tab_id):
+        """通过浏览器driver激活标签页，不使用http接口
+        :param tab_id: 标签页id
+        :return: None
+        """
+        self._browser_driver.Target.activateTarget(targetId=tab_id)
+        self._targets.activate(tab_id)
+
     def close_tabs(self, tabs_or_ids=None, others=False):
         """关闭传入的标签页，默认关闭当前页。可传入多个
         :param tabs_or_ids: 要关闭的标签页对象或id，可传入列表或元组，为None时关闭当前页
@@ -313,10 +361,8 @@ class ChromiumPage(ChromiumBase):
         if self.tab_id in tabs:
             self.driver.stop()
 
-        for tab in tabs:
-            self._control_session.get(f'http://{self.address}/json/close/{tab}')
-        while len(self.tabs) != end_len:
-            sleep(.1)
+        self.browser_driver.call_methods([('Target.closeTarget', {'targetId': tab}) for tab in tabs])
+        self._targets.wait_for(lambda: not tabs & set(self._targets.tabs), self.timeout)
 
         if self._main_tab in tabs:
             self._main_tab = self.tabs[0]
@@ -356,6 +402,17 @@ class ChromiumPage(ChromiumBase):
         """关闭浏览器"""
         self._tab_obj.Browser.close()
         self._tab_obj.stop()
+        if self._process is not None:  # 管道方式启动的浏览器没有端口，等待进程退出
+            try:
+                self._process.wait(10)
+            except TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._browser_driver.stop()
+            if self._tmp_user_path:
+                rmtree(self._tmp_user_path, ignore_errors=True)
+                self._tmp_user_path = None
+            return
         ip, port = self.address.split(':')
         while port_is_using(ip, port):
             sleep(.1)
@@ -399,9 +456,131 @@ class ChromiumPageWaiter(ChromiumBaseWaiter):
         :return: 是否等到下载开始
         """
         timeout = timeout if timeout is not None else self._driver.timeout
-        end_time = perf_counter() + timeout
-        while self._driver.tab_id == self._driver.latest_tab and perf_counter() < end_time:
-            sleep(.01)
+        return self._driver.targets.wait_for(lambda: self._driver.tab_id != self._driver.latest_tab, timeout)
+
+
+class TargetRegistry(object):
+    """通过浏览器driver的Target事件维护的标签页信息表，读取时无须访问浏览器
+    顺序只在连接时按/json接口初始化，之后只随新建标签页和本库的激活操作更新，
+    cdp没有标签页获得焦点的事件，用户在浏览器中手动切换的标签页不会反映到顺序中
+    """
+
+    def __init__(self, driver, order=None, address=None):
+        """
+        :param driver: 浏览器级别的ChromiumDriver对象
+        :param order: 按最近使用排序的标签页id列表，用于确定已有标签页的先后
+        :param address: 浏览器ip:port，用于生成调试地址，管道连接时为None
+        """
+        self._address = address
+        self._cond = Condition(RLock())
+        self._targets = OrderedDict()  # 最近创建或激活的排在最后
+
+        driver.Target.targetCreated = self._on_target_created
+        driver.Target.targetInfoChanged = self._on_target_info_changed
+        driver.Target.targetDestroyed = self._on_target_destroyed
+
+        order = order or []
+        infos = driver.Target.getTargets().get('targetInfos', [])
+        infos.sort(key=lambda i: order.index(i['targetId']) if i['targetId'] in order else len(order), reverse=True)
+        with self._cond:
+            for info in infos:
+                self._targets[info['targetId']] = dict(info, id=info['targetId'])
+        driver.Target.setDiscoverTargets(discover=True)
+
+    def __contains__(self, tab_id):
+        return tab_id in self._targets
+
+    @property
+    def tabs(self):
+        """返回所有标签页id组成的列表，最近创建或激活的在前"""
+        with self._cond:
+            return [k for k, v in reversed(self._targets.items()) if v['type'] == 'page']
+
+    def infos(self):
+        """返回所有target信息组成的列表，最近创建或激活的在前
+        :return: 信息字典列表，格式和/json接口相同
+        """
+        with self._cond:
+            return [self._to_json_info(i) for i in reversed(self._targets.values())]
+
+    def _to_json_info(self, info):
+        """把Target信息转换为/json接口返回的格式
+        :param info: Target.TargetInfo字典
+        :return: 信息字典
+        """
+        tid = info['targetId']
+        r = {'description': '', 'id': tid, 'title': info.get('title', ''),
+             'type': info['type'], 'url': info.get('url', '')}
+        if self._address:
+            r['devtoolsFrontendUrl'] = f'/devtools/inspector.html?ws={self._address}/devtools/page/{tid}'
+            r['webSocketDebuggerUrl'] = f'ws://{self._address}/devtools/page/{tid}'
+        return r
+
+    def activate(self, tab_id):
+        """标记标签页为最近激活
+        :param tab_id: 标签页id
+        :return: None
+        """
+        with self._cond:
+            if tab_id in self._targets:
+                self._targets.move_to_end(tab_id)
+                self._cond.notify_all()
+
+    def wait_for(self, predicate, timeout=None):
+        """等待信息表满足条件，每当有target创建、改变或关闭时重新检查
+        :param predicate: 无参数的判断方法
+        :param timeout: 超时时间（秒），为None时一直等待
+        :return: 是否等到
+        """
+        with self._cond:
+            return self._cond.wait_for(predicate, timeout)
+
+    def wait_created(self, before, timeout=None):
+        """等待不在before中的标签页出现
+        :param before: 已有的标签页id集合
+        :param timeout: 超时时间（秒），为None时一直等待
+        :return: 新标签页id，超时返回None
+        """
+        before = set(before)
+        with self._cond:
+            if self._cond.wait_for(lambda: set(self.tabs) - before, timeout):
+                return (set(self.tabs) - before).pop()
+        return None
+
+    def wait_destroyed(self, tab_ids, timeout=None):
+        """等待指定标签页全部关闭
+        :param tab_ids: 标签页id集合
+        :param timeout: 超时时间（秒），为None时一直等待
+        :return: 是否等到
+        """
+        tab_ids = set(tab_ids)
+        return self.wait_for(lambda: not tab_ids & set(self._targets), timeout)
+
+    def _on_target_created(self, **kwargs):
+        """target创建时触发"""
+        info = kwargs['targetInfo']
+        with self._cond:
+            if info['targetId'] in self._targets:  # 开启发现时会为已有target补发此事件，不改变其顺序
+                self._targets[info['targetId']].update(info)
+            else:
+                self._targets[info['targetId']] = dict(info, id=info['targetId'])
+            self._cond.notify_all()
+
+    def _on_target_info_changed(self, **kwargs):
+        """target信息改变时触发"""
+        info = kwargs['targetInfo']
+        with self._cond:
+            if info['targetId'] in self._targets:
+                self._targets[info['targetId']].update(info)
+            else:
+                self._targets[info['targetId']] = dict(info, id=info['targetId'])
+            self._cond.notify_all()
+
+    def _on_target_destroyed(self, **kwargs):
+        """target关闭时触发"""
+        with self._cond:
+            self._targets.pop(kwargs['targetId'], None)
+            self._cond.notify_all()
 
 
 class ChromiumTabRect(object):
@@ -716,7 +895,7 @@ class ChromiumPageSetter(ChromiumBaseSetter):
             tab_or_id = self._page.tab_id
         elif isinstance(tab_or_id, ChromiumTab):
             tab_or_id = tab_or_id.tab_id
-        self._page._control_session.get(f'http://{self._page.address}/json/activate/{tab_or_id}')
+        self._page._activate_tab(tab_or_id)
 
 
 def show_or_hide_browser(page, hide=True):
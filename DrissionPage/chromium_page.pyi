@@ -5,15 +5,17 @@
 """
 from os import popen
 from pathlib import Path
-from threading import Thread
-from typing import Union, Tuple, List
+from collections import OrderedDict
+from subprocess import Popen
+from threading import Thread, Condition
+from typing import Union, Tuple, List, Any, Callable, Iterable, Optional
 
 from DownloadKit import DownloadKit
 from requests import Session
 
 from .chromium_base import ChromiumBase, ChromiumBaseSetter, ChromiumBaseWaiter, NetworkListener
 from .chromium_driver import ChromiumDriver
-from .chromium_tab import ChromiumTab
+from .chromium_tab import ChromiumTab, TabPool
 from .configs.chromium_options import ChromiumOptions
 from .configs.driver_options import DriverOptions
 from .session_page import DownloadSetter
@@ -27,12 +29,15 @@ class ChromiumPage(ChromiumBase):
                  timeout: float = None):
         self._driver_options: [ChromiumDriver, DriverOptions] = ...
         self._process_id: str = ...
+        self._process: Union[Popen, None] = ...
+        self._tmp_user_path: Union[str, None] = ...
         self._window_setter: WindowSetter = ...
         self._main_tab: str = ...
         self._alert: Alert = ...
         self._download_path: str = ...
         self._download_set: ChromiumDownloadSetter = ...
         self._browser_driver: ChromiumDriver = ...
+        self._targets: TargetRegistry = ...
         self._rect: ChromiumTabRect = ...
 
     def _connect_browser(self,
@@ -41,6 +46,10 @@ class ChromiumPage(ChromiumBase):
 
     def _set_start_options(self, addr_driver_opts: Union[str, ChromiumDriver, DriverOptions], none) -> None: ...
 
+    def _browser_driver_init(self, driver: ChromiumDriver = None) -> None: ...
+
+    def _get_flatten_driver(self) -> Union[ChromiumDriver, None]: ...
+
     def _page_init(self) -> None: ...
 
     @property
@@ -64,6 +73,9 @@ class ChromiumPage(ChromiumBase):
     @property
     def latest_tab(self) -> str: ...
 
+    @property
+    def targets(self) -> TargetRegistry: ...
+
     @property
     def process_id(self) -> Union[None, int]: ...
 
@@ -81,6 +93,8 @@ class ChromiumPage(ChromiumBase):
 
     def get_tab(self, tab_id: str = None) -> ChromiumTab: ...
 
+    def tab_pool(self, size: int = 4, queue_size: int = None) -> TabPool: ...
+
     def find_tabs(self, title: str = None, url: str = None,
                   tab_type: Union[str, list, tuple, set] = None, single: bool = True) -> Union[str, List[str]]: ...
 
@@ -93,6 +107,8 @@ class ChromiumPage(ChromiumBase):
     def _to_tab(self, tab_or_id: Union[str, ChromiumTab] = None, activate: bool = True,
                 read_doc: bool = True) -> None: ...
 
+    def _activate_tab(self, tab_id: str) -> None: ...
+
     def close_tabs(self, tabs_or_ids: Union[
         str, ChromiumTab, List[Union[str, ChromiumTab]], Tuple[Union[str, ChromiumTab]]] = None,
                    others: bool = False) -> None: ...
@@ -118,6 +134,36 @@ class ChromiumPageWaiter(ChromiumBaseWaiter):
     def new_tab(self, timeout: float = None) -> bool: ...
 
 
+class TargetRegistry(object):
+    def __init__(self, driver: ChromiumDriver, order: List[str] = None, address: str = None):
+        self._address: Optional[str] = ...
+        self._cond: Condition = ...
+        self._targets: OrderedDict = ...
+
+    def __contains__(self, tab_id: str) -> bool: ...
+
+    @property
+    def tabs(self) -> List[str]: ...
+
+    def infos(self) -> List[dict]: ...
+
+    def _to_json_info(self, info: dict) -> dict: ...
+
+    def activate(self, tab_id: str) -> None: ...
+
+    def wait_for(self, predicate: Callable[[], Any], timeout: float = None) -> bool: ...
+
+    def wait_created(self, before: Iterable[str], timeout: float = None) -> Union[str, None]: ...
+
+    def wait_destroyed(self, tab_ids: Iterable[str], timeout: float = None) -> bool: ...
+
+    def _on_target_created(self, **kwargs) -> None: ...
+
+    def _on_target_info_changed(self, **kwargs) -> None: ...
+
+    def _on_target_destroyed(self, **kwargs) -> None: ...
+
+
 class ChromiumTabRect(object):
     def __init__(self, page: ChromiumPage):
         self._page: ChromiumPage = ...
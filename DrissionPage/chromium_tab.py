@@ -3,7 +3,11 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
+from collections import deque
+from concurrent.futures import Future
 from copy import copy
+from queue import Queue
+from threading import Thread, Lock
 
 from .chromium_base import ChromiumBase, ChromiumBaseSetter
 from .commons.web import set_session_cookies, set_browser_cookies
@@ -97,6 +101,11 @@ class WebPageTab(SessionPage, ChromiumTab):
         elif self._mode == 'd':
             return super(SessionPage, self).html if self._has_driver else ''
 
+    @property
+    def _html_tree(self):
+        """返回s模式已解析的页面根元素，d模式返回None"""
+        return super()._html_tree if self._mode == 's' else None
+
     @property
     def json(self):
         """当返回内容是json格式时，返回对应的字典"""
@@ -300,16 +309,14 @@ class WebPageTab(SessionPage, ChromiumTab):
             selenium_user_agent = self.run_cdp('Runtime.evaluate', expression='navigator.userAgent;')['result']['value']
             self.session.headers.update({"User-Agent": selenium_user_agent})
 
-        set_session_cookies(self.session, super(SessionPage, self).get_cookies())
+        set_session_cookies(self.session, super(SessionPage, self).get_cookies(all_info=True), only_changed=True)
 
     def cookies_to_browser(self):
         """把session对象的cookies复制到浏览器"""
         if not self._has_driver:
             return
 
-        # set_browser_cookies(self, super().get_cookies(as_dict=True))
-        # set_browser_cookies(self, super().get_cookies(all_domains=True))
-        set_browser_cookies(self, super().get_cookies())
+        set_browser_cookies(self, super().get_cookies(all_info=True), only_changed=True)
 
     def get_cookies(self, as_dict=False, all_domains=False, all_info=False):
         """返回cookies
@@ -388,3 +395,137 @@ class WebPageTabDownloadSetter(DownloadSetter):
             self._page.session.headers.update({"User-Agent": ua})
             set_session_cookies(self._page.session, self._page.get_cookies(as_dict=False, all_domains=False))
         return self.DownloadKit
+
+
+class TabPool(object):
+    """用固定数量的可重用标签页并发执行任务的池，每个标签页由一个工作线程独占"""
+
+    def __init__(self, page, size=4, queue_size=None):
+        """
+        :param page: ChromiumPage对象
+        :param size: 标签页数量
+        :param queue_size: 待执行任务队列的最大长度，队列满时提交任务会阻塞，为None时为size的2倍
+        """
+        if size < 1:
+            raise ValueError('size参数必须大于0。')
+        self._page = page
+        self._tasks = Queue(maxsize=queue_size or size * 2)
+        self._closed = False
+        self._lock = Lock()
+        self.tabs = []
+        self._threads = []
+
+        for _ in range(size):
+            tab = ChromiumTab(page, page.new_tab())
+            thread = Thread(target=self._worker, args=(tab,), daemon=True)
+            self.tabs.append(tab)
+            self._threads.append(thread)
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def size(self):
+        """返回标签页数量"""
+        return len(self.tabs)
+
+    @property
+    def pending(self):
+        """返回等待执行的任务数量"""
+        return self._tasks.qsize()
+
+    def submit(self, fn, *args, **kwargs):
+        """提交一个任务，由空闲的标签页执行fn(tab, *args, **kwargs)，队列满时阻塞
+        :param fn: 要执行的方法，第一个参数为执行任务的ChromiumTab对象
+        :param args: 传递给fn的位置参数
+        :param kwargs: 传递给fn的关键字参数
+        :return: Future对象
+        """
+        future = Future()
+        with self._lock:  # 在锁内放入，保证任务在close()放入结束标记之前进入队列
+            if self._closed:
+                raise RuntimeError('TabPool已关闭。')
+            self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def map(self, urls, fn=None):
+        """每个标签页访问一个url后执行fn(tab)，按urls的顺序逐个返回结果
+        :param urls: 要访问的url，可以是任意可迭代对象
+        :param fn: 页面加载后要执行的方法，参数为ChromiumTab对象，为None时返回页面html
+        :return: 结果生成器
+        """
+        futures = deque()
+        for url in urls:
+            futures.append(self.submit(_get_and_run, url, fn))
+            while futures and futures[0].done():
+                yield futures.popleft().result()
+
+        while futures:
+            yield futures.popleft().result()
+
+    def close(self, close_tabs=True):
+        """等待已提交的任务完成后关闭池
+        :param close_tabs: 是否关闭池中的标签页
+        :return: None
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+
+        if close_tabs:
+            self._page.close_tabs([tab.tab_id for tab in self.tabs])
+
+    def _worker(self, tab):
+        """工作线程，从队列取出任务并用指定标签页执行
+        :param tab: 该线程独占的ChromiumTab对象
+        :return: None
+        """
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+
+            future, fn, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(fn(tab, *args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                _reset_tab(tab)
+
+
+def _get_and_run(tab, url, fn):
+    """访问url后执行方法，供TabPool.map()使用
+    :param tab: ChromiumTab对象
+    :param url: 要访问的url
+    :param fn: 要执行的方法，为None时返回页面html
+    :return: fn的返回值
+    """
+    tab.get(url)
+    return fn(tab) if fn else tab.html
+
+
+def _reset_tab(tab):
+    """清除标签页的sessionStorage，并跳转到空白页，以便执行下一个任务
+    localStorage、cookies和缓存由同一网站的所有标签页共用，清除会影响其它仍在运行的标签页，不在此清除
+    :param tab: ChromiumTab对象
+    :return: None
+    """
+    try:
+        tab.run_cdp('Runtime.evaluate', expression='try{sessionStorage.clear();}catch(e){}')
+        tab.get('about:blank', retry=0)  # 等待跳转完成，避免与下一个任务的跳转冲突
+    except Exception:
+        pass
@@ -3,9 +3,13 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
-from typing import Union, Tuple, Any, List
+from concurrent.futures import Future
+from queue import Queue
+from threading import Thread, Lock
+from typing import Union, Tuple, Any, List, Callable, Iterable, Generator
 
 from DownloadKit import DownloadKit
+from lxml.html import HtmlElement
 from requests import Session, Response
 
 from .chromium_base import ChromiumBase, ChromiumBaseSetter
@@ -53,6 +57,9 @@ class WebPageTab(SessionPage, ChromiumTab):
     @property
     def html(self) -> str: ...
 
+    @property
+    def _html_tree(self) -> Union[HtmlElement, None]: ...
+
     @property
     def json(self) -> dict: ...
 
@@ -178,3 +185,37 @@ class WebPageTabDownloadSetter(DownloadSetter):
 
     @property
     def _switched_DownloadKit(self) -> DownloadKit: ...
+
+
+class TabPool(object):
+    def __init__(self, page: ChromiumPage, size: int = 4, queue_size: int = None):
+        self._page: ChromiumPage = ...
+        self._tasks: Queue = ...
+        self._closed: bool = ...
+        self._lock: Lock = ...
+        self.tabs: List[ChromiumTab] = ...
+        self._threads: List[Thread] = ...
+
+    def __enter__(self) -> TabPool: ...
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None: ...
+
+    @property
+    def size(self) -> int: ...
+
+    @property
+    def pending(self) -> int: ...
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future: ...
+
+    def map(self, urls: Iterable[str], fn: Callable[[ChromiumTab], Any] = None) -> Generator[Any, None, None]: ...
+
+    def close(self, close_tabs: bool = True) -> None: ...
+
+    def _worker(self, tab: ChromiumTab) -> None: ...
+
+
+def _get_and_run(tab: ChromiumTab, url: str, fn: Union[Callable[[ChromiumTab], Any], None]) -> Any: ...
+
+
+def _reset_tab(tab: ChromiumTab) -> None: ...
@@ -4,13 +4,16 @@
 @Contact :   g1879@qq.com
 """
 from json import load, dump
+from os import name as os_name, pipe, close
 from pathlib import Path
+from shutil import which, rmtree
 from subprocess import Popen
-from tempfile import gettempdir
+from tempfile import gettempdir, mkdtemp
 from time import perf_counter, sleep
 
 from requests import get as requests_get
 
+from DrissionPage.chromium_driver import ChromiumDriver, PipeConnection
 from DrissionPage.configs.chromium_options import ChromiumOptions
 from DrissionPage.errors import BrowserConnectError
 from .tools import port_is_using
@@ -54,6 +57,105 @@ def connect_browser(option):
     return chrome_path, debugger
 
 
+def launch_browser(option, timeout=30):
+    """启动一个由系统分配调试端口的新浏览器，端口从用户文件夹中的DevToolsActivePort文件读取
+    :param option: ChromiumOptions对象，须已设置独立的用户文件夹
+    :param timeout: 等待浏览器启动的超时时间（秒）
+    :return: 浏览器地址和进程对象组成的元组
+    """
+    if not option.user_data_path:
+        raise ValueError('须为每个浏览器设置独立的用户文件夹。')
+
+    port_file = Path(option.user_data_path) / 'DevToolsActivePort'
+    if port_file.exists():
+        port_file.unlink()
+
+    args = get_launch_args(option)
+    set_prefs(option)
+
+    try:
+        debugger = _run_browser(0, option.browser_path, args)
+    except FileNotFoundError:
+        from DrissionPage.easy_set import get_chrome_path
+        chrome_path = get_chrome_path(show_msg=False)
+        if not chrome_path:
+            raise FileNotFoundError('无法找到chrome路径，请手动配置。')
+        debugger = _run_browser(0, chrome_path, args)
+
+    end_time = perf_counter() + timeout
+    while perf_counter() < end_time:
+        if debugger.poll() is not None:
+            raise BrowserConnectError(f'浏览器进程已退出，返回码：{debugger.returncode}')
+
+        try:
+            port = port_file.read_text(encoding='utf-8').split('\n')[0].strip()
+        except OSError:
+            port = None
+
+        if port:
+            test_connect('127.0.0.1', port)
+            return f'127.0.0.1:{port}', debugger
+        sleep(.05)
+
+    debugger.kill()
+    raise BrowserConnectError('等待浏览器启动超时。')
+
+
+def launch_pipe_browser(option, timeout=30):
+    """以--remote-debugging-pipe方式启动浏览器，通过继承的文件描述符通信，不占用端口，不需要http接口
+    :param option: ChromiumOptions对象
+    :param timeout: 等待浏览器响应的超时时间（秒）
+    :return: 已连接的浏览器级别ChromiumDriver对象、进程对象和临时用户文件夹路径组成的元组，
+             指定了用户文件夹时路径为None，否则须在浏览器退出后删除
+    """
+    if os_name == 'nt':
+        raise OSError('管道连接方式只支持Linux和macOS系统。')
+
+    args = get_launch_args(option)
+    set_prefs(option)
+
+    tmp_path = None
+    if not any(i.startswith('--user-data-dir=') for i in args):  # 没有端口可以区分，每个浏览器使用独立的临时文件夹
+        tmp_dir = Path(gettempdir()) / 'DrissionPage'
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = mkdtemp(prefix='userData_pipe_', dir=tmp_dir)
+        args.append(f'--user-data-dir={tmp_path}')
+
+    try:
+        try:
+            debugger, connection = _run_pipe_browser(option.browser_path, args)
+        except FileNotFoundError:
+            from DrissionPage.easy_set import get_chrome_path
+            chrome_path = get_chrome_path(show_msg=False)
+            if not chrome_path:
+                raise FileNotFoundError('无法找到chrome路径，请手动配置。')
+            debugger, connection = _run_pipe_browser(chrome_path, args)
+    except Exception:
+        if tmp_path:
+            rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    # 浏览器就绪后会立即回复，进程退出时管道关闭，调用马上返回，无须轮询
+    driver = ChromiumDriver('pipe', 'browser', 'pipe', pipe=connection)
+    driver.start()
+    try:
+        r = driver.call_method('Browser.getVersion', _timeout=timeout)
+    except TimeoutError:
+        r = {'error': '等待浏览器启动超时。'}
+    except OSError as e:  # 进程已退出，管道已断开
+        r = {'error': str(e)}
+
+    if 'error' in r:
+        driver.stop()
+        if debugger.poll() is None:
+            debugger.kill()
+        debugger.wait()
+        if tmp_path:
+            rmtree(tmp_path, ignore_errors=True)
+        raise BrowserConnectError(f'以管道方式连接浏览器失败：{r["error"]}，返回码：{debugger.returncode}')
+    return driver, debugger, tmp_path
+
+
 def get_launch_args(opt):
     """从DriverOptions获取命令行启动参数
     :param opt: DriverOptions或ChromiumOptions
@@ -75,7 +177,8 @@ def get_launch_args(opt):
 
         result.add(i)
 
-    if not has_user_path and not opt.system_user_path:
+    # 管道方式的临时文件夹由launch_pipe_browser()创建和管理
+    if not has_user_path and not opt.system_user_path and not getattr(opt, 'remote_debugging_pipe', False):
         port = opt.debugger_address.split(':')[-1] if opt.debugger_address else '0'
         path = Path(gettempdir()) / 'DrissionPage' / f'userData_{port}'
         path.mkdir(parents=True, exist_ok=True)
@@ -181,6 +284,36 @@ def _run_browser(port, path: str, args) -> Popen:
         raise FileNotFoundError('未找到浏览器，请手动指定浏览器可执行文件路径。')
 
 
+def _run_pipe_browser(path, args):
+    """创建以管道通信的chrome进程，浏览器从fd 3读取指令，向fd 4写入回复
+    :param path: 浏览器地址
+    :param args: 启动参数
+    :return: 进程对象和PipeConnection对象组成的元组
+    """
+    p = Path(path)
+    p = which(str(p / 'chrome') if p.is_dir() else str(path))
+    if not p:
+        raise FileNotFoundError('未找到浏览器，请手动指定浏览器可执行文件路径。')
+
+    # 不用preexec_fn（有线程运行时fork后执行python代码不安全），由Popen把管道放到子进程的stdin和stdout，
+    # 再由sh用exec把它们移到3、4号并替换为浏览器进程，进程对象的pid即浏览器的pid，浏览器的stdout改到stderr
+    arguments = ['/bin/sh', '-c', 'exec "$0" "$@" 3<&0 4>&1 </dev/null >&2', p, '--remote-debugging-pipe']
+    arguments.extend(args)
+
+    to_browser = pipe()
+    from_browser = pipe()
+    try:
+        process = Popen(arguments, shell=False, stdin=to_browser[0], stdout=from_browser[1])
+    except Exception:
+        close(to_browser[1])
+        close(from_browser[0])
+        raise
+    finally:
+        close(to_browser[0])
+        close(from_browser[1])
+    return process, PipeConnection(from_browser[0], to_browser[1])
+
+
 def _make_leave_in_dict(target_dict: dict, src: list, num: int, end: int) -> None:
     """把prefs中a.b.c形式的属性转为a['b']['c']形式
     :param target_dict: 要处理的字典
@@ -3,8 +3,10 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
-from typing import Union
+from subprocess import Popen
+from typing import Union, Tuple
 
+from DrissionPage.chromium_driver import ChromiumDriver
 from DrissionPage.configs.chromium_options import ChromiumOptions
 from DrissionPage.configs.driver_options import DriverOptions
 
@@ -12,6 +14,13 @@ from DrissionPage.configs.driver_options import DriverOptions
 def connect_browser(option: Union[ChromiumOptions, DriverOptions]) -> tuple: ...
 
 
+def launch_browser(option: ChromiumOptions, timeout: float = 30) -> Tuple[str, Popen]: ...
+
+
+def launch_pipe_browser(option: ChromiumOptions,
+                        timeout: float = 30) -> Tuple[ChromiumDriver, Popen, Union[str, None]]: ...
+
+
 def get_launch_args(opt: Union[ChromiumOptions, DriverOptions]) -> list: ...
 
 
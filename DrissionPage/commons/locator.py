@@ -3,9 +3,13 @@
 @Author  :   g1879
 @Contact :   g1879@qq.com
 """
+from functools import lru_cache
 from re import split
 from .by import By
 
+# 定位符缓存的最大条目数
+LOC_CACHE_SIZE = 1024
+
 
 def get_loc(loc, translate_css=False):
     """接收selenium定位元组或本库定位语法，转换为标准定位元组，可翻译css selector为xpath
@@ -13,6 +17,21 @@ def get_loc(loc, translate_css=False):
     :param translate_css: 是否翻译css selector为xpath
     :return: DrissionPage定位元组
     """
+    try:
+        return _get_loc(loc, translate_css)
+    except TypeError:
+        if isinstance(loc, (tuple, str)):  # 元组中有不可哈希的对象，不使用缓存
+            return _get_loc.__wrapped__(loc, translate_css)
+        raise
+
+
+@lru_cache(maxsize=LOC_CACHE_SIZE)
+def _get_loc(loc, translate_css=False):
+    """get_loc()的缓存实现，相同定位符只解析一次
+    :param loc: selenium定位元组或本库定位语法
+    :param translate_css: 是否翻译css selector为xpath
+    :return: DrissionPage定位元组
+    """
     if isinstance(loc, tuple):
         loc = translate_loc(loc)
 
@@ -34,6 +53,35 @@ def get_loc(loc, translate_css=False):
     return loc
 
 
+def compile_loc(loc):
+    """把标准定位元组编译为lxml可直接调用的查找对象，结果会被缓存
+    :param loc: 标准定位元组，类型为xpath或css selector
+    :return: lxml的XPath或CSSSelector对象
+    """
+    return _compile_xpath(loc[1]) if loc[0] == 'xpath' else _compile_css(loc[1])
+
+
+@lru_cache(maxsize=LOC_CACHE_SIZE)
+def _compile_xpath(xpath):
+    """编译xpath语句
+    :param xpath: xpath字符串
+    :return: XPath对象
+    """
+    from lxml.etree import XPath
+    return XPath(xpath)
+
+
+@lru_cache(maxsize=LOC_CACHE_SIZE)
+def _compile_css(css):
+    """编译css selector语句
+    :param css: css selector字符串
+    :return: CSSSelector对象
+    """
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(css, translator='html')
+
+
+@lru_cache(maxsize=LOC_CACHE_SIZE)
 def str_to_loc(loc):
     """处理元素查找语句
     :param loc: 查找语法字符串
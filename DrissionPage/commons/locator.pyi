@@ -5,10 +5,27 @@
 """
 from typing import Union
 
+from lxml.cssselect import CSSSelector
+from lxml.etree import XPath
+
+LOC_CACHE_SIZE: int
+
 
 def get_loc(loc: Union[tuple, str], translate_css: bool = False) -> tuple: ...
 
 
+def _get_loc(loc: Union[tuple, str], translate_css: bool = False) -> tuple: ...
+
+
+def compile_loc(loc: tuple) -> Union[XPath, CSSSelector]: ...
+
+
+def _compile_xpath(xpath: str) -> XPath: ...
+
+
+def _compile_css(css: str) -> CSSSelector: ...
+
+
 def str_to_loc(loc: str) -> tuple: ...
 
 
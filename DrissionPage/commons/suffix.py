@@ -0,0 +1,155 @@
+# -*- coding:utf-8 -*-
+"""
+@Author  :   g1879
+@Contact :   g1879@qq.com
+"""
+from collections import namedtuple
+from functools import lru_cache
+from json import load, dump
+from pathlib import Path
+from threading import Lock
+from urllib.parse import urlparse
+
+# 由publicsuffix.org的public_suffix_list.dat预编译成的字典树，数据以MPL 2.0协议发布
+SUFFIX_FILE = Path(__file__).parent / 'public_suffix.json'
+EXTRACT_CACHE_SIZE = 1024
+
+_trie = None
+_trie_lock = Lock()
+
+
+class ExtractResult(namedtuple('ExtractResult', ('subdomain', 'domain', 'suffix'))):
+    """域名拆分结果，用法与tldextract的ExtractResult相同"""
+    __slots__ = ()
+
+    @property
+    def registered_domain(self):
+        """返回可注册域名，如www.example.co.uk返回example.co.uk"""
+        return f'{self.domain}.{self.suffix}' if self.domain and self.suffix else ''
+
+    @property
+    def fqdn(self):
+        """返回完整域名"""
+        return '.'.join(i for i in self if i) if self.domain and self.suffix else ''
+
+
+def extract(url, private=False):
+    """把网址的主机名拆分为子域名、域名和公共后缀，不访问网络
+    :param url: 网址或主机名
+    :param private: 是否使用公共后缀列表中的私有域名部分，如github.io
+    :return: ExtractResult对象
+    """
+    url = url.strip()
+    host = urlparse(url if '//' in url else f'//{url}').hostname or ''
+    return _extract_host(host.rstrip('.'), private)
+
+
+@lru_cache(maxsize=EXTRACT_CACHE_SIZE)
+def _extract_host(host, private):
+    """拆分主机名
+    :param host: 小写的主机名
+    :param private: 是否使用私有域名部分
+    :return: ExtractResult对象
+    """
+    if not host or ':' in host or host.replace('.', '').isdigit():  # ip地址
+        return ExtractResult('', host, '')
+
+    labels = host.split('.')
+    num = _suffix_len(labels, private)
+    if num == 0:
+        return ExtractResult('.'.join(labels[:-1]), labels[-1], '')
+    if num == len(labels):
+        return ExtractResult('', '', host)
+    return ExtractResult('.'.join(labels[:-num - 1]), labels[-num - 1], '.'.join(labels[-num:]))
+
+
+def _suffix_len(labels, private):
+    """在字典树中查找公共后缀
+    :param labels: 主机名按.分割后的列表
+    :param private: 是否使用私有域名部分
+    :return: 公共后缀的段数，没有匹配时返回0
+    """
+    node = _get_trie()
+    num = 0
+    for i, label in enumerate(reversed(labels)):
+        if _is_rule(node.get(f'!{label}', None), private):  # 例外规则，其上一级才是公共后缀
+            return i
+        if _is_rule(node.get('*', None), private):
+            num = i + 1
+
+        node = node.get(label, None)
+        if node is None:
+            break
+        if _is_rule(node, private):
+            num = i + 1
+
+    return num
+
+
+def _is_rule(node, private):
+    """判断字典树节点是否一条规则的结尾
+    :param node: 字典树节点
+    :param private: 是否使用私有域名部分
+    :return: bool
+    """
+    return node is not None and (node.get('', 0) == 1 or (private and node.get('', 0) == 2))
+
+
+def _get_trie():
+    """返回公共后缀字典树，首次调用时从文件读取"""
+    global _trie
+    if _trie is None:
+        with _trie_lock:
+            if _trie is None:
+                with open(SUFFIX_FILE, 'r', encoding='utf-8') as f:
+                    _trie = load(f)
+    return _trie
+
+
+def compile_suffix_list(src, dst=None):
+    """把public_suffix_list.dat编译成本模块使用的字典树文件，用于更新内置数据
+    :param src: public_suffix_list.dat文件路径
+    :param dst: 保存路径，为None时覆盖内置文件
+    :return: None
+    """
+    global _trie
+    trie = {}
+    flag = 1
+    with open(src, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('// ===BEGIN PRIVATE DOMAINS==='):
+                flag = 2
+            if not line or line.startswith('//'):
+                continue
+
+            rule = line.split()[0].lower()
+            for r in {rule, _to_ascii(rule)}:
+                if not r:
+                    continue
+                node = trie
+                for label in reversed(r.split('.')):
+                    node = node.setdefault(label, {})
+                node[''] = flag
+
+    with open(dst or SUFFIX_FILE, 'w', encoding='utf-8') as f:
+        dump(trie, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    if dst is None:
+        _trie = None
+        _extract_host.cache_clear()
+
+
+def _to_ascii(rule):
+    """把包含非ascii字符的规则转为punycode形式
+    :param rule: 规则文本
+    :return: 转换后的规则，无法转换时返回None
+    """
+    labels = []
+    for label in rule.split('.'):
+        prefix = '!' if label.startswith('!') else ''
+        label = label.lstrip('!')
+        try:
+            labels.append(prefix + (label if label == '*' else label.encode('idna').decode()))
+        except UnicodeError:
+            return None
+    return '.'.join(labels)
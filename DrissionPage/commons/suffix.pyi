@@ -0,0 +1,47 @@
+# -*- coding:utf-8 -*-
+"""
+@Author  :   g1879
+@Contact :   g1879@qq.com
+"""
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple, List, Union
+
+SUFFIX_FILE: Path = ...
+EXTRACT_CACHE_SIZE: int = ...
+
+_trie: Union[dict, None] = ...
+_trie_lock: Lock = ...
+
+
+class ExtractResult(NamedTuple):
+    subdomain: str
+    domain: str
+    suffix: str
+
+    @property
+    def registered_domain(self) -> str: ...
+
+    @property
+    def fqdn(self) -> str: ...
+
+
+def extract(url: str, private: bool = False) -> ExtractResult: ...
+
+
+def _extract_host(host: str, private: bool) -> ExtractResult: ...
+
+
+def _suffix_len(labels: List[str], private: bool) -> int: ...
+
+
+def _is_rule(node: Union[dict, None], private: bool) -> bool: ...
+
+
+def _get_trie() -> dict: ...
+
+
+def compile_suffix_list(src: Union[str, Path], dst: Union[str, Path] = None) -> None: ...
+
+
+def _to_ascii(rule: str) -> Union[str, None]: ...
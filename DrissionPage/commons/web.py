@@ -4,24 +4,30 @@
 @Contact :   g1879@qq.com
 """
 from base64 import b64decode
+from functools import lru_cache
 from html import unescape
 from http.cookiejar import Cookie
 from json import loads, JSONDecodeError
-from re import sub
+from pathlib import Path
+from re import compile
 from urllib.parse import urlparse, urljoin, urlunparse
 
 from requests.cookies import RequestsCookieJar
 from requests.structures import CaseInsensitiveDict
-from tldextract import extract
+
+from .constants import ERROR
+from ..errors import NoResourceError
+from .suffix import extract
 
 
 class ResponseData(object):
     """返回的数据包管理类"""
-    __slots__ = ('requestId', 'response', 'rawBody', 'tab', 'target', 'url', 'status', 'statusText', 'securityDetails',
-                 'headersText', 'mimeType', 'requestHeadersText', 'connectionReused', 'connectionId', 'remoteIPAddress',
-                 'remotePort', 'fromDiskCache', 'fromServiceWorker', 'fromPrefetchCache', 'encodedDataLength', 'timing',
-                 'serviceWorkerResponseSource', 'responseTime', 'cacheStorageCacheName', 'protocol', 'securityState',
-                 '_requestHeaders', '_body', '_base64_body', '_rawPostData', '_postData', 'method')
+    __slots__ = ('requestId', 'response', '_rawBody', '_body_loader', 'tab', 'target', 'url', 'status', 'statusText',
+                 'securityDetails', 'headersText', 'mimeType', 'requestHeadersText', 'connectionReused',
+                 'connectionId', 'remoteIPAddress', 'remotePort', 'fromDiskCache', 'fromServiceWorker',
+                 'fromPrefetchCache', 'encodedDataLength', 'timing', 'serviceWorkerResponseSource', 'responseTime',
+                 'cacheStorageCacheName', 'protocol', 'securityState', '_requestHeaders', '_body', '_base64_body',
+                 '_rawPostData', '_postData', 'method', '_page', '_frame_id')
 
     def __init__(self, request_id, response, body, tab, target):
         """
@@ -32,7 +38,8 @@ class ResponseData(object):
         """
         self.requestId = request_id
         self.response = CaseInsensitiveDict(response)
-        self.rawBody = body
+        self._rawBody = body
+        self._body_loader = None
         self.tab = tab
         self.target = target
         self._requestHeaders = None
@@ -40,6 +47,8 @@ class ResponseData(object):
         self._body = None
         self._base64_body = False
         self._rawPostData = None
+        self._page = None
+        self._frame_id = None
 
     def __getattr__(self, item):
         return self.response.get(item, None)
@@ -84,89 +93,198 @@ class ResponseData(object):
         """设置postData"""
         self._rawPostData = val
 
+    @property
+    def rawBody(self):
+        """返回未处理的body内容，若尚未获取，在第一次调用时获取，无法获取时返回None"""
+        loader = self._body_loader
+        if loader is not None:
+            self._rawBody, self._base64_body = loader()
+            self._body_loader = None
+        return self._rawBody
+
+    @rawBody.setter
+    def rawBody(self, val):
+        """设置未处理的body内容"""
+        self._rawBody = val
+        self._body_loader = None
+
     @property
     def body(self):
         """返回body内容，如果是json格式，自动进行转换，如果时图片格式，进行base64转换，其它格式直接返回文本"""
         if self._body is None:
+            raw_body = self.rawBody
             if self._base64_body:
-                self._body = b64decode(self.rawBody)
+                self._body = b64decode(raw_body)
 
             else:
                 try:
-                    self._body = loads(self.rawBody)
+                    self._body = loads(raw_body)
                 except (JSONDecodeError, TypeError):
-                    self._body = self.rawBody
+                    self._body = raw_body
 
         return self._body
 
+    def iter_content(self, chunk_size=1048576):
+        """逐块返回body的字节数据，监听时未获取body（或获取失败）且请求为GET时，通过浏览器以流方式重新读取，
+        内存占用不随资源大小增长；已获取或正在获取的body直接使用，不重复请求；body不可用时抛出NoResourceError
+        :param chunk_size: 每块的字节数
+        :return: bytes生成器
+        """
+        handle = None
+        if self.rawBody is None and self._page is not None and self.method == 'GET':
+            handle = open_resource_stream(self._page, self._frame_id or self.tab, self.response.get('url'))
+
+        if handle:
+            for chunk in read_stream(self._page, handle, chunk_size):
+                yield chunk
+            return
+
+        raw_body = self.rawBody
+        if raw_body is None:
+            raise NoResourceError('未获取到body，且无法通过浏览器重新读取。')
+        data = b64decode(raw_body) if self._base64_body else raw_body.encode('utf-8')
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    def save(self, path, chunk_size=1048576):
+        """把body逐块写入文件，body不可用时抛出NoResourceError，不创建文件
+        :param path: 文件路径
+        :param chunk_size: 每次写入的字节数
+        :return: 文件绝对路径
+        """
+        chunks = self.iter_content(chunk_size)
+        first = next(chunks, b'')
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(first)
+            for chunk in chunks:
+                f.write(chunk)
+        return str(path.absolute())
+
+
+# 前面无须换行的元素
+_NOWRAP_TAGS = frozenset(('br', 'sub', 'sup', 'em', 'strong', 'a', 'font', 'b', 'span', 's', 'i', 'del', 'ins', 'img',
+                          'td', 'th', 'abbr', 'bdi', 'bdo', 'cite', 'code', 'data', 'dfn', 'kbd', 'mark', 'q', 'rp',
+                          'rt', 'ruby', 'samp', 'small', 'time', 'u', 'var', 'wbr', 'button', 'slot', 'content'))
+# 后面添加换行的元素
+_WRAP_AFTER_TAGS = frozenset(('p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ol', 'li', 'blockquote', 'header',
+                              'footer', 'address' 'article', 'aside', 'main', 'nav', 'section', 'figcaption',
+                              'summary'))
+# 不获取文本的元素
+_NO_TEXT_TAGS = frozenset(('script', 'style', 'video', 'audio', 'iframe', 'embed', 'noscript', 'canvas', 'template'))
+# 用/t分隔的元素
+_TAB_TAGS = frozenset(('td', 'th'))
+_MULTI_SPACES = compile(r' {2,}')
+
+
+def open_resource_stream(page, frame_id, url):
+    """让浏览器加载一个资源并返回其数据流句柄，可用IO.read分块读取
+    :param page: ChromiumBase对象
+    :param frame_id: 发起加载的frame id
+    :param url: 资源url
+    :return: 数据流句柄，加载失败时返回None
+    """
+    if not url or url.startswith(('data:', 'blob:')):
+        return None
+    try:
+        r = page.run_cdp('Network.loadNetworkResource', frameId=frame_id, url=url,
+                         options={'disableCache': False, 'includeCredentials': True})
+    except Exception:
+        return None
+    resource = r.get('resource', {})
+    return resource.get('stream') if resource.get('success') else None
+
+
+def read_stream(page, handle, chunk_size=1048576):
+    """用IO.read分块读取数据流，读完后关闭
+    :param page: ChromiumBase对象
+    :param handle: 数据流句柄
+    :param chunk_size: 每块的字节数
+    :return: bytes生成器
+    """
+    try:
+        while True:
+            r = page.run_cdp('IO.read', handle=handle, size=chunk_size)
+            data = r.get('data', '')
+            if data:
+                yield b64decode(data) if r.get('base64Encoded') else data.encode('utf-8')
+            if r.get('eof', True):
+                break
+    finally:
+        try:
+            page.run_cdp('IO.close', handle=handle)
+        except Exception:
+            pass
+
 
 def get_ele_txt(e):
     """获取元素内所有文本
     :param e: 元素对象
     :return: 元素内所有文本
     """
-    # 前面无须换行的元素
-    nowrap_list = ('br', 'sub', 'sup', 'em', 'strong', 'a', 'font', 'b', 'span', 's', 'i', 'del', 'ins', 'img', 'td',
-                   'th', 'abbr', 'bdi', 'bdo', 'cite', 'code', 'data', 'dfn', 'kbd', 'mark', 'q', 'rp', 'rt', 'ruby',
-                   'samp', 'small', 'time', 'u', 'var', 'wbr', 'button', 'slot', 'content')
-    # 后面添加换行的元素
-    wrap_after_list = ('p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ol', 'li', 'blockquote', 'header',
-                       'footer', 'address' 'article', 'aside', 'main', 'nav', 'section', 'figcaption', 'summary')
-    # 不获取文本的元素
-    noText_list = ('script', 'style', 'video', 'audio', 'iframe', 'embed', 'noscript', 'canvas', 'template')
-    # 用/t分隔的元素
-    tab_list = ('td', 'th')
-
-    if e.tag in noText_list:
+    if e.tag in _NO_TEXT_TAGS:
         return e.raw_text
 
-    def get_node_txt(ele, pre: bool = False):
-        tag = ele.tag
-        if tag == 'br':
-            return [True]
-        if not pre and tag == 'pre':
-            pre = True
-
-        str_list = []
-        if tag in noText_list and not pre:  # 标签内的文本不返回
-            return str_list
-
-        nodes = ele.eles('xpath:./text() | *')
-        prev_ele = ''
-        for el in nodes:
-            if isinstance(el, str):  # 字符节点
-                if pre:
-                    str_list.append(el)
-
-                else:
-                    if sub('[ \n\t\r]', '', el) != '':  # 字符除了回车和空格还有其它内容
-                        txt = el
-                        if not pre:
-                            txt = txt.replace('\n', ' ').strip(' ')
-                            txt = sub(r' {2,}', ' ', txt)
-                        str_list.append(txt)
-
-            else:  # 元素节点
-                if el.tag not in nowrap_list and str_list and str_list[-1] != '\n':  # 元素间换行的情况
-                    str_list.append('\n')
-                if el.tag in tab_list and prev_ele in tab_list:  # 表格的行
-                    str_list.append('\t')
-
-                str_list.extend(get_node_txt(el, pre))
-                prev_ele = el.tag
-
-        if tag in wrap_after_list and str_list and str_list[-1] not in ('\n', True):  # 有些元素后面要添加回车
-            str_list.append('\n')
-
-        return str_list
-
-    re_str = get_node_txt(e)
-    if re_str and re_str[-1] == '\n':
-        re_str.pop()
-    re_str = ''.join([i if i is not True else '\n' for i in re_str])
+    str_list = []
+    _get_node_txt(e.inner_ele, str_list)
+    if str_list and str_list[-1] == '\n':
+        str_list.pop()
+    re_str = ''.join([i if i is not True else '\n' for i in str_list])
     return format_html(re_str)
 
 
+def _get_node_txt(ele, str_list, pre=False):
+    """直接遍历lxml元素，把其中的文本按顺序添加到列表，换行符用True表示
+    :param ele: lxml元素对象
+    :param str_list: 用于收集文本的列表
+    :param pre: 是否在pre元素内
+    :return: None
+    """
+    tag = ele.tag
+    if tag == 'br':
+        str_list.append(True)
+        return
+    if not pre and tag == 'pre':
+        pre = True
+    if tag in _NO_TEXT_TAGS and not pre:  # 标签内的文本不返回
+        return
+
+    begin = len(str_list)
+    prev_tag = ''
+    _add_txt(ele.text, str_list, pre)
+    for el in ele:
+        el_tag = el.tag
+        if isinstance(el_tag, str):  # 元素节点，注释等节点只取其后的文本
+            if el_tag not in _NOWRAP_TAGS and len(str_list) > begin and str_list[-1] != '\n':  # 元素间换行的情况
+                str_list.append('\n')
+            if el_tag in _TAB_TAGS and prev_tag in _TAB_TAGS:  # 表格的行
+                str_list.append('\t')
+
+            _get_node_txt(el, str_list, pre)
+            prev_tag = el_tag
+
+        _add_txt(el.tail, str_list, pre)
+
+    if tag in _WRAP_AFTER_TAGS and len(str_list) > begin and str_list[-1] not in ('\n', True):  # 有些元素后面要添加回车
+        str_list.append('\n')
+
+
+def _add_txt(txt, str_list, pre):
+    """处理一个文本节点并添加到列表
+    :param txt: 文本
+    :param str_list: 用于收集文本的列表
+    :param pre: 是否在pre元素内
+    :return: None
+    """
+    if not txt or txt == '\n':
+        return
+    if pre:
+        str_list.append(txt)
+    elif txt.strip(' \n\t\r'):  # 字符除了回车和空格还有其它内容
+        str_list.append(_MULTI_SPACES.sub(' ', txt.replace('\n', ' ').strip(' ')))
+
+
 def format_html(text):
     """处理html编码字符
     :param text: html文本
@@ -307,13 +425,21 @@ def cookies_to_tuple(cookies):
     return cookies
 
 
-def set_session_cookies(session, cookies):
+_CDP_COOKIE_KEYS = frozenset(('name', 'value', 'url', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires',
+                              'expiry', 'priority', 'sameParty', 'sourceScheme', 'sourcePort', 'partitionKey'))
+
+
+def set_session_cookies(session, cookies, only_changed=False):
     """设置Session对象的cookies
     :param session: Session对象
     :param cookies: cookies信息
+    :param only_changed: 是否只设置与Session对象中不同的cookies
     :return: None
     """
     cookies = cookies_to_tuple(cookies)
+    if only_changed:
+        cookies = cookies_diff(cookies, session.cookies)
+
     for cookie in cookies:
         if cookie['value'] is None:
             cookie['value'] = ''
@@ -324,58 +450,122 @@ def set_session_cookies(session, cookies):
 
         if 'expiry' in cookie:
             kwargs['expires'] = cookie['expiry']
+        if kwargs.get('expires', None) is not None:
+            # 浏览器中会话cookie的expires为-1
+            if kwargs['expires'] < 0:
+                kwargs.pop('expires')
+            else:
+                kwargs['expires'] = int(kwargs['expires'])
 
         session.cookies.set(cookie['name'], cookie['value'], **kwargs)
 
 
-def set_browser_cookies(page, cookies):
-    """设置cookies值
+def set_browser_cookies(page, cookies, only_changed=False):
+    """设置cookies值，所有cookies用一次Network.setCookies设置
     :param page: 页面对象
     :param cookies: cookies信息
+    :param only_changed: 是否只设置与浏览器中不同的cookies
     :return: None
     """
-    cookies = cookies_to_tuple(cookies)
-    for cookie in cookies:
-        if 'expiry' in cookie:
-            cookie['expires'] = int(cookie['expiry'])
-            cookie.pop('expiry')
-        if 'expires' in cookie:
+    url = page._browser_url
+    host = urlparse(url).hostname or ''
+    cookies = [_format_browser_cookie(cookie, host) for cookie in cookies_to_tuple(cookies)]
+    if only_changed and cookies:
+        cookies = cookies_diff(cookies, page.run_cdp_loaded('Network.getCookies')['cookies'])
+    if not cookies:
+        return
+
+    try:
+        page.run_cdp_loaded('Network.setCookies', cookies=cookies)
+        return
+    except Exception:
+        pass
+
+    # 有cookie不被接受时整批都会失败，改为在一次往返中逐个设置，不成功的依次尝试当前页面的各级域名
+    candidates = cookie_domains(url)
+    todo = [(cookie, [] if 'url' in cookie else [i for i in candidates if i != cookie['domain']])
+            for cookie in cookies]
+    while todo:
+        results = page.driver.call_methods([('Network.setCookie', cookie) for cookie, _ in todo])
+        todo = [(cookie, domains) for (cookie, domains), r in zip(todo, results)
+                if domains and (ERROR in r or r.get('success', True) is False)]
+        for cookie, domains in todo:
+            cookie['domain'] = domains.pop(0)
+
+
+def _format_browser_cookie(cookie, host):
+    """把cookie转为Network.setCookie可接受的格式
+    :param cookie: dict格式cookie
+    :param host: 当前页面的主机名，用于没有指定域名的cookie
+    :return: 格式化后的cookie
+    """
+    cookie = {k: v for k, v in cookie.items() if k in _CDP_COOKIE_KEYS and v is not None}
+    if cookie.get('expiry', None) is not None:
+        cookie['expires'] = cookie.pop('expiry')
+    cookie.setdefault('value', '')
+    if 'expires' in cookie:
+        if cookie['expires'] < 0:
+            cookie.pop('expires')
+        else:
             cookie['expires'] = int(cookie['expires'])
-        if cookie['value'] is None:
-            cookie['value'] = ''
 
-        if cookie['name'].startswith('__Secure-'):
-            cookie['secure'] = True
+    if cookie['name'].startswith('__Secure-'):
+        cookie['secure'] = True
 
-        if cookie['name'].startswith('__Host-'):
-            cookie['path'] = '/'
-            cookie['secure'] = True
+    if cookie['name'].startswith('__Host-'):
+        # __Host-前缀的cookie不能有domain，只能用url指定
+        cookie.pop('domain', None)
+        cookie['path'] = '/'
+        cookie['secure'] = True
+        cookie['url'] = f'https://{host}/'
+    elif not cookie.get('domain', None) and 'url' not in cookie:
+        cookie['domain'] = host
 
-        else:
-            if cookie.get('domain', None):
-                try:
-                    page.run_cdp_loaded('Network.setCookie', **cookie)
-                    if is_cookie_in_driver(page, cookie):
-                        continue
-                except Exception:
-                    pass
-
-        ex_url = extract(page._browser_url)
-        d_list = ex_url.subdomain.split('.')
-        d_list.append(f'{ex_url.domain}.{ex_url.suffix}' if ex_url.suffix else ex_url.domain)
-
-        tmp = [d_list[0]]
-        if len(d_list) > 1:
-            for i in d_list[1:]:
-                tmp.append('.')
-                tmp.append(i)
-
-        for i in range(len(tmp)):
-            d = ''.join(tmp[i:])
-            cookie['domain'] = d
-            page.run_cdp_loaded('Network.setCookie', **cookie)
-            if is_cookie_in_driver(page, cookie):
-                break
+    return cookie
+
+
+def cookies_diff(cookies, existing):
+    """返回cookies中与现有cookies不同的项，以name、domain、path和value比较
+    :param cookies: dict格式cookie组成的列表
+    :param existing: 现有的cookies，可为dict格式cookie组成的列表或CookieJar
+    :return: 有变化的cookies列表
+    """
+    values = {}
+    for c in existing:
+        if isinstance(c, Cookie):
+            c = {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path}
+        values[_cookie_key(c)] = c['value'] or ''
+    return [c for c in cookies if values.get(_cookie_key(c), None) != (c['value'] or '')]
+
+
+def _cookie_key(cookie):
+    """返回用于比较cookie的键
+    :param cookie: dict格式cookie
+    :return: (name, domain, path)
+    """
+    return cookie['name'], (cookie.get('domain', None) or '').lstrip('.').lower(), cookie.get('path', None) or '/'
+
+
+@lru_cache(maxsize=256)
+def cookie_domains(url):
+    """返回cookie可使用的域名，从当前主机名逐级到可注册域名
+    :param url: 网址
+    :return: 域名组成的tuple
+    """
+    host = urlparse(url).hostname
+    if not host:
+        return ()
+
+    ex_url = extract(url, private=True)
+    if not ex_url.suffix:  # ip或localhost等
+        return host,
+
+    domain = f'{ex_url.domain}.{ex_url.suffix}'
+    domains = [host]
+    for i in range(1, host.count('.') - domain.count('.') + 1):
+        d = host.split('.', i)[-1]
+        domains.extend((f'.{d}', d))
+    return tuple(domains)
 
 
 def is_cookie_in_driver(page, cookie):
@@ -4,8 +4,10 @@
 @Contact :   g1879@qq.com
 """
 from http.cookiejar import Cookie
-from typing import Union
+from pathlib import Path
+from typing import Union, List, Callable, Tuple, Generator, Iterable
 
+from lxml.html import HtmlElement
 from requests import Session
 from requests.cookies import RequestsCookieJar
 from requests.structures import CaseInsensitiveDict
@@ -20,7 +22,10 @@ class ResponseData(object):
     def __init__(self, request_id: str, response: dict, body: str, tab: str, target: str):
         self.requestId: str = ...
         self.response: CaseInsensitiveDict = ...
-        self.rawBody: str = ...
+        self._rawBody: Union[str, None] = ...
+        self._page: Union[ChromiumBase, None] = ...
+        self._frame_id: Union[str, None] = ...
+        self._body_loader: Union[Callable[[], Tuple[str, bool]], None] = ...
         self._body: Union[str, dict, bytes] = ...
         self._base64_body: bool = ...
         self.tab: str = ...
@@ -71,13 +76,35 @@ class ResponseData(object):
     @postData.setter
     def postData(self, val: Union[str, dict]) -> None: ...
 
+    @property
+    def rawBody(self) -> Union[str, None]: ...
+
+    @rawBody.setter
+    def rawBody(self, val: Union[str, None]) -> None: ...
+
     @property
     def body(self) -> Union[str, dict, bytes]: ...
 
+    def iter_content(self, chunk_size: int = 1048576) -> Generator[bytes, None, None]: ...
+
+    def save(self, path: Union[str, Path], chunk_size: int = 1048576) -> str: ...
+
+
+def open_resource_stream(page: ChromiumBase, frame_id: str, url: str) -> Union[str, None]: ...
+
+
+def read_stream(page: ChromiumBase, handle: str, chunk_size: int = 1048576) -> Generator[bytes, None, None]: ...
+
 
 def get_ele_txt(e: DrissionElement) -> str: ...
 
 
+def _get_node_txt(ele: HtmlElement, str_list: List[Union[str, bool]], pre: bool = False) -> None: ...
+
+
+def _add_txt(txt: Union[str, None], str_list: List[Union[str, bool]], pre: bool) -> None: ...
+
+
 def format_html(text: str) -> str: ...
 
 
@@ -99,10 +126,26 @@ def cookie_to_dict(cookie: Union[Cookie, str, dict]) -> dict: ...
 def cookies_to_tuple(cookies: Union[RequestsCookieJar, list, tuple, str, dict]) -> tuple: ...
 
 
-def set_session_cookies(session: Session, cookies: Union[RequestsCookieJar, list, tuple, str, dict]) -> None: ...
+def set_session_cookies(session: Session,
+                        cookies: Union[RequestsCookieJar, list, tuple, str, dict],
+                        only_changed: bool = False) -> None: ...
+
+
+def set_browser_cookies(page: ChromiumBase,
+                        cookies: Union[RequestsCookieJar, list, tuple, str, dict],
+                        only_changed: bool = False) -> None: ...
+
+
+def _format_browser_cookie(cookie: dict, host: str) -> dict: ...
+
+
+def cookies_diff(cookies: Iterable[dict], existing: Union[RequestsCookieJar, Iterable[dict]]) -> List[dict]: ...
+
+
+def _cookie_key(cookie: dict) -> Tuple[str, str, str]: ...
 
 
-def set_browser_cookies(page: ChromiumBase, cookies: Union[RequestsCookieJar, list, tuple, str, dict]) -> None: ...
+def cookie_domains(url: str) -> Tuple[str, ...]: ...
 
 
 def is_cookie_in_driver(page: ChromiumBase, cookie: dict) -> bool: ...
@@ -35,6 +35,8 @@ class ChromiumOptions(object):
             self._page_load_strategy = options.get('page_load_strategy', 'normal')
             self._proxy = om.proxies.get('http', None)
             self._system_user_path = options.get('system_user_path', False)
+            self._flatten_sessions = options.get('flatten_sessions', False)
+            self._remote_debugging_pipe = options.get('remote_debugging_pipe', False)
 
             user_path = user = False
             for arg in self._arguments:
@@ -71,6 +73,8 @@ class ChromiumOptions(object):
         self._proxy = None
         self._auto_port = False
         self._system_user_path = False
+        self._flatten_sessions = False
+        self._remote_debugging_pipe = False
 
     @property
     def download_path(self):
@@ -138,6 +142,16 @@ class ChromiumOptions(object):
         """返回是否使用系统安装的浏览器所使用的用户数据文件夹"""
         return self._system_user_path
 
+    @property
+    def flatten_sessions(self):
+        """返回是否通过浏览器连接以flatten方式控制所有标签页"""
+        return self._flatten_sessions
+
+    @property
+    def remote_debugging_pipe(self):
+        """返回是否以管道方式启动并控制浏览器"""
+        return self._remote_debugging_pipe
+
     def set_argument(self, arg, value=None):
         """设置浏览器配置的argument属性
         :param arg: 属性名
@@ -341,6 +355,23 @@ class ChromiumOptions(object):
         self._system_user_path = on_off
         return self
 
+    def use_flatten_sessions(self, on_off=True):
+        """设置是否通过浏览器连接以flatten方式控制所有标签页和异域frame，开启后只使用一个websocket连接
+        :param on_off: 开或关
+        :return: 当前对象
+        """
+        self._flatten_sessions = on_off
+        return self
+
+    def use_remote_debugging_pipe(self, on_off=True):
+        """设置是否以--remote-debugging-pipe方式启动浏览器，通过管道而不是端口通信，所有标签页以flatten方式控制
+        只能用于由本库启动的浏览器，不支持Windows系统，开启后不能接管已打开的浏览器，也不能使用异步driver
+        :param on_off: 开或关
+        :return: 当前对象
+        """
+        self._remote_debugging_pipe = on_off
+        return self
+
     def auto_port(self, on_off=True):
         """自动获取可用端口
         :param on_off: 是否开启自动获取端口号
@@ -380,7 +411,7 @@ class ChromiumOptions(object):
 
         # 设置chrome_options
         attrs = ('debugger_address', 'binary_location', 'arguments', 'extensions', 'user', 'page_load_strategy',
-                 'auto_port', 'system_user_path')
+                 'auto_port', 'system_user_path', 'flatten_sessions', 'remote_debugging_pipe')
         for i in attrs:
             om.set_item('chrome_options', i, self.__getattribute__(f'_{i}'))
         # 设置代理
@@ -25,6 +25,8 @@ class ChromiumOptions(object):
         self._prefs_to_del: list = ...
         self._auto_port: bool = ...
         self._system_user_path: bool = ...
+        self._flatten_sessions: bool = ...
+        self._remote_debugging_pipe: bool = ...
 
     @property
     def download_path(self) -> str: ...
@@ -65,6 +67,12 @@ class ChromiumOptions(object):
     @property
     def system_user_path(self) -> bool: ...
 
+    @property
+    def flatten_sessions(self) -> bool: ...
+
+    @property
+    def remote_debugging_pipe(self) -> bool: ...
+
     def set_argument(self, arg: str, value: Union[str, None, bool] = None) -> ChromiumOptions: ...
 
     def remove_argument(self, value: str) -> ChromiumOptions: ...
@@ -104,6 +112,10 @@ class ChromiumOptions(object):
 
     def use_system_user_path(self, on_off: bool = True) -> ChromiumOptions: ...
 
+    def use_flatten_sessions(self, on_off: bool = True) -> ChromiumOptions: ...
+
+    def use_remote_debugging_pipe(self, on_off: bool = True) -> ChromiumOptions: ...
+
     def auto_port(self, on_off: bool = True) -> ChromiumOptions: ...
 
     def save(self, path: Union[str, Path] = None) -> str: ...
@@ -10,10 +10,10 @@ from urllib.parse import urlparse
 from DownloadKit import DownloadKit
 from requests import Session, Response
 from requests.structures import CaseInsensitiveDict
-from tldextract import extract
 
 from .base import BasePage
 from DrissionPage.configs.session_options import SessionOptions
+from DrissionPage.commons.suffix import extract
 from DrissionPage.commons.web import cookie_to_dict, set_session_cookies
 from .session_element import SessionElement, make_session_ele
 
@@ -11,7 +11,7 @@ from lxml.html import HtmlElement, fromstring
 
 from .base import DrissionElement, BasePage, BaseElement
 from .commons.constants import NoneElement
-from .commons.locator import get_loc
+from .commons.locator import get_loc, compile_loc
 from .commons.web import get_ele_txt, make_absolute_link
 
 
@@ -312,7 +312,8 @@ def make_session_ele(html_or_ele, loc=None, single=True):
         elif loc[0] == 'css selector' and loc[1].lstrip().startswith('>'):
             loc_str = f'{html_or_ele.css_path}{loc[1]}'
             if html_or_ele.page:
-                html_or_ele = fromstring(html_or_ele.page.html)
+                tree = getattr(html_or_ele.page, '_html_tree', None)
+                html_or_ele = fromstring(html_or_ele.page.html) if tree is None else tree
             else:  # 接收html文本，无page的情况
                 html_or_ele = fromstring(html_or_ele('xpath:/ancestor::*').html)
 
@@ -342,7 +343,8 @@ def make_session_ele(html_or_ele, loc=None, single=True):
     # 各种页面对象
     elif isinstance(html_or_ele, BasePage):
         page = html_or_ele
-        html_or_ele = fromstring(html_or_ele.html)
+        tree = getattr(page, '_html_tree', None)  # SessionPage会缓存已解析的页面
+        html_or_ele = fromstring(page.html) if tree is None else tree
 
     # 直接传入html文本
     elif isinstance(html_or_ele, str):
@@ -359,10 +361,7 @@ def make_session_ele(html_or_ele, loc=None, single=True):
 
     # ---------------执行查找-----------------
     try:
-        if loc[0] == 'xpath':  # 用lxml内置方法获取lxml的元素对象列表
-            ele = html_or_ele.xpath(loc[1])
-        else:  # 用css selector获取元素对象列表
-            ele = html_or_ele.cssselect(loc[1])
+        ele = compile_loc(loc)(html_or_ele)  # 使用缓存的已编译XPath或CSSSelector对象查找
 
         if not isinstance(ele, list):  # 结果不是列表，如数字
             return ele
@@ -9,10 +9,11 @@ from urllib.parse import urlparse
 
 from DownloadKit import DownloadKit
 from requests import Session
+from lxml.html import fromstring
 from requests.structures import CaseInsensitiveDict
-from tldextract import extract
 
 from .base import BasePage
+from .commons.suffix import extract
 from .commons.web import cookie_to_dict, set_session_cookies
 from .configs.session_options import SessionOptions
 from .session_element import SessionElement, make_session_ele
@@ -20,6 +21,8 @@ from .session_element import SessionElement, make_session_ele
 
 class SessionPage(BasePage):
     """SessionPage封装了页面操作的常用功能，使用requests来获取、解析网页"""
+    # 已解析的页面缓存，格式为(response, encoding, 根元素)
+    _html_cache = None
 
     def __init__(self, session_or_options=None, timeout=None):
         """
@@ -90,6 +93,18 @@ class SessionPage(BasePage):
         """返回页面的html文本"""
         return self.response.text if self.response else ''
 
+    @property
+    def _html_tree(self):
+        """返回已解析的页面根元素，response或其编码改变时才重新解析，没有response时返回None"""
+        r = self._response
+        if r is None:
+            return None
+
+        cache = self._html_cache
+        if cache is None or cache[0] is not r or cache[1] != r.encoding:
+            cache = self._html_cache = r, r.encoding, fromstring(self.html)
+        return cache[2]
+
     @property
     def json(self):
         """当返回内容是json格式时，返回对应的字典，非json格式时返回None"""
@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Any, Union, Tuple, List
 
 from DownloadKit import DownloadKit
+from lxml.html import HtmlElement
 from requests import Session, Response
 from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
@@ -22,6 +23,7 @@ from .web_page import WebPage
 
 
 class SessionPage(BasePage):
+    _html_cache: Union[Tuple[Response, str, HtmlElement], None] = ...
     def __init__(self,
                  session_or_options: Union[Session, SessionOptions] = None,
                  timeout: float = None):
@@ -60,6 +62,9 @@ class SessionPage(BasePage):
     @property
     def html(self) -> str: ...
 
+    @property
+    def _html_tree(self) -> Union[HtmlElement, None]: ...
+
     @property
     def json(self) -> Union[dict, None]: ...
 
@@ -164,6 +164,11 @@ class WebPage(SessionPage, ChromiumPage, BasePage):
         elif self._mode == 'd':
             return super(SessionPage, self).html if self._has_driver else ''
 
+    @property
+    def _html_tree(self):
+        """返回s模式已解析的页面根元素，d模式返回None"""
+        return super()._html_tree if self._mode == 's' else None
+
     @property
     def json(self):
         """当返回内容是json格式时，返回对应的字典"""
@@ -372,16 +377,14 @@ class WebPage(SessionPage, ChromiumPage, BasePage):
             user_agent = self.run_cdp('Runtime.evaluate', expression='navigator.userAgent;')['result']['value']
             self.session.headers.update({"User-Agent": user_agent})
 
-        set_session_cookies(self.session, super(SessionPage, self).get_cookies())
+        set_session_cookies(self.session, super(SessionPage, self).get_cookies(all_info=True), only_changed=True)
 
     def cookies_to_browser(self):
         """把session对象的cookies复制到浏览器"""
         if not self._has_driver:
             return
 
-        # set_browser_cookies(self, super().get_cookies(as_dict=True))
-        # set_browser_cookies(self, super().get_cookies(all_domains=True))
-        set_browser_cookies(self, super().get_cookies())
+        set_browser_cookies(self, super().get_cookies(all_info=True), only_changed=True)
 
     def get_cookies(self, as_dict=False, all_domains=False, all_info=False):
         """返回cookies
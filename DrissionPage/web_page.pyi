@@ -6,6 +6,7 @@
 from typing import Union, Tuple, List, Any
 
 from DownloadKit import DownloadKit
+from lxml.html import HtmlElement
 from requests import Session, Response
 
 from .base import BasePage
@@ -55,6 +56,9 @@ class WebPage(SessionPage, ChromiumPage, BasePage):
     @property
     def html(self) -> str: ...
 
+    @property
+    def _html_tree(self) -> Union[HtmlElement, None]: ...
+
     @property
     def json(self) -> dict: ...
 
@@ -25,9 +25,11 @@ setup(
         'DownloadKit>=1.0.0',
         'FlowViewer>=0.3.0',
         'websocket-client',
-        'click',
-        'tldextract'
+        'click'
     ],
+    extras_require={
+        'async': ['websockets'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3.6",
         "Development Status :: 4 - Beta",